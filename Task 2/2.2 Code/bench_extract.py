@@ -0,0 +1,83 @@
+"""Benchmark: per-row locator calls vs. one page.evaluate() for table extraction.
+
+Loads synthetic erail-style pages (an <h1> and a station table) with a local
+Chromium and times both ways of extracting [train_no, train_name, station,
+timing] rows. No network access is needed.
+
+Run:
+    python bench_extract.py
+"""
+
+import asyncio
+import time
+
+from playwright.async_api import async_playwright
+
+from browser_pool import extract_page_table
+
+ROW_COUNTS = [10, 50, 100, 200]
+REPEATS = 5
+
+
+def make_page(rows):
+    body = "".join(
+        f"<tr><td>Station {i}</td><td>{i % 24:02d}:{i % 60:02d}</td><td>PF {i % 6}</td></tr>"
+        for i in range(rows)
+    )
+    return (
+        "<html><body><h1>12953 Test Express</h1><table>"
+        "<tr><th>Station</th><th>Timing</th><th>Platform</th></tr>"
+        f"{body}</table></body></html>"
+    )
+
+
+async def extract_per_row(page, train_no):
+    """The original scrape_train() extraction: several round trips per row"""
+    train_name = await page.locator("h1").inner_text()
+    rows = page.locator("table tr")
+    row_count = await rows.count()
+
+    data = []
+    for i in range(row_count):
+        cols = rows.nth(i).locator("td")
+        if await cols.count() == 0:
+            continue
+        station = await cols.nth(0).inner_text()
+        timing = await cols.nth(1).inner_text()
+        data.append([train_no, train_name, station, timing])
+    return data
+
+
+async def extract_single_pass(page, train_no):
+    page_data = await extract_page_table(page)
+    return [[train_no, page_data["title"], cells[0], cells[1] if len(cells) > 1 else ""]
+            for cells in page_data["rows"]]
+
+
+async def time_it(page, extract):
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = await extract(page, "12953")
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+async def main():
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+
+        print(f"{'rows':>6} {'per-row (ms)':>14} {'single pass (ms)':>18} {'speedup':>9}")
+        for rows in ROW_COUNTS:
+            await page.set_content(make_page(rows))
+            before, old_rows = await time_it(page, extract_per_row)
+            after, new_rows = await time_it(page, extract_single_pass)
+            assert old_rows == new_rows, "extraction paths disagree"
+            print(f"{rows:>6} {before * 1000:>14.1f} {after * 1000:>18.1f} {before / after:>8.1f}x")
+
+        await browser.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+"""Benchmark: documents/sec per HTML parsing backend, full vs. targeted parsing.
+
+For each saved page (index.html by default, plus a synthetic erail-style
+schedule page) and every installed backend in html_parsing, measures how many
+documents per second can be fully parsed, and how many when only tables or
+only links are extracted.
+
+Run:
+    python bench_html_parsing.py [page.html ...]
+"""
+
+import sys
+import time
+
+from html_parsing import available_backends, parse_document, parse_links, parse_tables
+
+MIN_SECONDS = 0.5   # keep each measurement running at least this long
+
+
+def make_schedule_page(rows=300):
+    body = "".join(
+        f"<tr><td><a href='/station/{i}'>Station {i}</a></td><td>{i % 24:02d}:{i % 60:02d}</td>"
+        f"<td>{i % 24:02d}:{(i + 2) % 60:02d}</td><td>{i % 30} min</td></tr>"
+        for i in range(rows)
+    )
+    filler = "".join(f"<div class='ad'><p>Promo {i}</p><img src='/ad/{i}.png'></div>" for i in range(200))
+    return (
+        "<html><head><title>12953 Running Status</title>"
+        "<script>var tracking = {};</script></head><body>"
+        f"<h1>12953 August Kranti Rajdhani</h1>{filler}"
+        "<table><tr><th>Station</th><th>Arrival</th><th>Departure</th><th>Delay</th></tr>"
+        f"{body}</table>{filler}</body></html>"
+    ).encode("utf-8")
+
+
+def docs_per_second(func, content, backend):
+    runs, started = 0, time.perf_counter()
+    while True:
+        func(content, backend)
+        runs += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_SECONDS:
+            return runs / elapsed
+
+
+def main(paths):
+    pages = [(path, open(path, "rb").read()) for path in paths]
+    pages.append(("synthetic schedule", make_schedule_page()))
+
+    backends = available_backends()
+    if not backends:
+        print("No HTML parser installed (selectolax, lxml or beautifulsoup4).")
+        return
+
+    for name, content in pages:
+        print(f"\n{name} ({len(content) / 1024:.0f} KB), documents/sec")
+        print(f"{'backend':>11} {'full parse':>11} {'tables only':>12} {'links only':>11}")
+        for backend in backends:
+            full = docs_per_second(parse_document, content, backend)
+            tables = docs_per_second(parse_tables, content, backend)
+            links = docs_per_second(parse_links, content, backend)
+            print(f"{backend:>11} {full:>11.0f} {tables:>12.0f} {links:>11.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ["index.html"])
@@ -0,0 +1,72 @@
+"""Benchmark: markdown -> HTML -> BeautifulSoup vs. the single-pass md_tables parser.
+
+Builds synthetic Firecrawl-style pages (prose, links and several station
+tables) of increasing size and times extracting every table with both paths.
+Needs `markdown` and `beautifulsoup4` for the old path.
+
+Run:
+    python bench_md_tables.py
+"""
+
+import time
+
+import markdown
+from bs4 import BeautifulSoup
+
+from md_tables import iter_tables
+
+PAGE_SIZES = [(2, 50), (5, 200), (10, 1000)]   # (tables, rows per table)
+REPEATS = 5
+
+
+def make_page(tables, rows):
+    parts = ["# 12953 August Kranti Rajdhani Express", ""]
+    for t in range(tables):
+        parts += [f"Running status section {t} with a [link](https://erail.in/{t}).", ""]
+        parts += ["| Station | Arrival | Departure | Delay |", "|:---|:-:|:-:|--:|"]
+        parts += [f"| [Station {t}-{r}](https://erail.in/s/{r}) | {r % 24:02d}:{r % 60:02d} "
+                  f"| {r % 24:02d}:{(r + 2) % 60:02d} | **{r % 30} min** |" for r in range(rows)]
+        parts.append("")
+    return "\n".join(parts)
+
+
+def soup_tables(md_text):
+    """The old extract_table_from_markdown() path, extended to every table"""
+    html = markdown.markdown(md_text, extensions=["tables"])
+    soup = BeautifulSoup(html, "html.parser")
+    tables = []
+    for table in soup.find_all("table"):
+        headers = [th.get_text(strip=True) for th in table.find_all("th")]
+        rows = [[td.get_text(strip=True) for td in tr.find_all("td")]
+                for tr in table.find_all("tr")[1:]]
+        tables.append((headers, [row for row in rows if row]))
+    return tables
+
+
+def single_pass_tables(md_text):
+    return [(table.headers, table.rows) for table in iter_tables(md_text, plain=True)]
+
+
+def time_it(extract, md_text):
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = extract(md_text)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    print(f"{'page':>14} {'size':>9} {'soup (ms)':>11} {'md_tables (ms)':>15} {'speedup':>9}")
+    for tables, rows in PAGE_SIZES:
+        page = make_page(tables, rows)
+        before, old = time_it(soup_tables, page)
+        after, new = time_it(single_pass_tables, page)
+        assert old == new, "parsers disagree"
+        label = f"{tables}x{rows} rows"
+        print(f"{label:>14} {len(page) / 1024:>7.0f}KB {before * 1000:>11.1f} "
+              f"{after * 1000:>15.2f} {before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
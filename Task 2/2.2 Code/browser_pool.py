@@ -0,0 +1,173 @@
+"""Bounded-concurrency browser crawling for Playwright and Crawl4AI.
+
+Both notebooks used to drive a single page serially. This module keeps a pool
+of browser contexts (one page each) so several train pages load at the same
+time, blocks requests the scrapers never look at (images, fonts, media,
+analytics), recycles each page after a number of uses so memory does not
+creep up, and yields every result as soon as it finishes.
+
+Usage (notebook / Colab):
+    async with BrowserPool(concurrency=4) as pool:
+        async for train_no, rows, error in pool.crawl(TRAIN_NUMBERS, scrape_train):
+            ...
+
+    async for url, result, error in crawl4ai_stream(train_urls, concurrency=4):
+        ...
+"""
+
+import asyncio
+
+DEFAULT_CONCURRENCY = 4
+MAX_USES_PER_PAGE = 25
+
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "hotjar.com",
+)
+
+
+async def _block_unneeded(route):
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(
+        host in request.url for host in BLOCKED_HOSTS
+    ):
+        await route.abort()
+    else:
+        await route.continue_()
+
+# Pulls the page heading and the cell texts of every table row in a single
+# page.evaluate() call, instead of count()/inner_text() round trips per row
+EXTRACT_TABLE_JS = """
+() => {
+    const h1 = document.querySelector("h1");
+    const rows = [];
+    for (const tr of document.querySelectorAll("table tr")) {
+        const cells = tr.querySelectorAll("td");
+        if (cells.length === 0) continue;
+        rows.push(Array.from(cells, td => td.innerText));
+    }
+    return {title: h1 ? h1.innerText : null, rows: rows};
+}
+"""
+
+
+async def extract_page_table(page):
+    """Return {"title": <h1 text>, "rows": [[td text, ...], ...]} for a page"""
+    return await page.evaluate(EXTRACT_TABLE_JS)
+
+
+class BrowserPool:
+    """Pool of Playwright pages, one browser context each"""
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, max_uses=MAX_USES_PER_PAGE,
+                 block_resources=True, headless=True):
+        self.concurrency = concurrency
+        self.max_uses = max_uses
+        self.block_resources = block_resources
+        self.headless = headless
+        self._playwright = None
+        self._browser = None
+        self._idle = None
+
+    async def __aenter__(self):
+        # Imported here so the module can be used for Crawl4AI alone
+        from playwright.async_api import async_playwright
+
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        self._idle = asyncio.Queue()
+        for _ in range(self.concurrency):
+            self._idle.put_nowait((await self._new_page(), 0))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._browser.close()
+        await self._playwright.stop()
+
+    async def _new_page(self):
+        context = await self._browser.new_context()
+        if self.block_resources:
+            await context.route("**/*", _block_unneeded)
+        return await context.new_page()
+
+    async def _checkout(self):
+        # A slot whose page could not be replaced holds None and is retried here
+        page, uses = await self._idle.get()
+        if page is not None and (uses >= self.max_uses or page.is_closed()):
+            old, page = page, None
+            try:
+                await old.context.close()
+            except Exception:
+                pass   # already gone with a crashed page
+        if page is None:
+            try:
+                page, uses = await self._new_page(), 0
+            except BaseException:
+                # Always give the slot back, or the pool shrinks and crawl() hangs
+                self._idle.put_nowait((None, 0))
+                raise
+        return page, uses
+
+    async def run(self, handler, item):
+        """Run `await handler(page, item)` on the next free page"""
+        page, uses = await self._checkout()
+        try:
+            return await handler(page, item)
+        finally:
+            self._idle.put_nowait((page, uses + 1))
+
+    async def crawl(self, items, handler):
+        """Yield (item, result, error) for every item as soon as it finishes"""
+        async def job(item):
+            try:
+                return item, await self.run(handler, item), None
+            except Exception as e:
+                return item, None, e
+
+        for finished in asyncio.as_completed([job(item) for item in items]):
+            yield await finished
+
+
+async def _block_in_context(page, context, **kwargs):
+    # Crawl4AI hook: same request blocking as BrowserPool for its contexts
+    await context.route("**/*", _block_unneeded)
+    return page
+
+
+async def crawl4ai_stream(urls, concurrency=DEFAULT_CONCURRENCY, max_uses=MAX_USES_PER_PAGE,
+                          block_resources=True, **run_kwargs):
+    """Crawl URLs with Crawl4AI, at most `concurrency` pages open at a time.
+
+    Yields (url, CrawlResult, error) as each page finishes. Images are not
+    loaded (`text_mode`), fonts, media and analytics are blocked through the
+    `on_page_context_created` hook, and the crawler's browser is restarted
+    after every `concurrency * max_uses` pages, i.e. about `max_uses` per
+    page slot, as BrowserPool does.
+    """
+    from crawl4ai import AsyncWebCrawler, BrowserConfig
+
+    urls = list(urls)
+    slots = asyncio.Semaphore(concurrency)
+    browser_config = BrowserConfig(headless=True, text_mode=True)
+    per_browser = concurrency * max_uses
+
+    for start in range(0, len(urls), per_browser):
+        async with AsyncWebCrawler(config=browser_config) as crawler:
+            if block_resources:
+                crawler.crawler_strategy.set_hook("on_page_context_created", _block_in_context)
+
+            async def job(url):
+                async with slots:
+                    try:
+                        return url, await crawler.arun(url=url, **run_kwargs), None
+                    except Exception as e:
+                        return url, None, e
+
+            batch = urls[start:start + per_browser]
+            for finished in asyncio.as_completed([job(url) for url in batch]):
+                yield await finished
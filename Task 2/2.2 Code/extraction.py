@@ -0,0 +1,349 @@
+"""Tiered schedule extraction: structural parser first, LLM only as a fallback.
+
+Sending every page's full markdown to the LLM is slow and burns tokens even
+though most erail/railyatri pages carry the schedule as a plain markdown
+table. `TieredExtractor` first tries a deterministic parser, validates the
+result against the schema used by the Groq prompt
+
+    {"train_name": "", "train_number": "", "route": [{"station": "", "arrival": "", "departure": ""}]}
+
+and only escalates to the LLM when validation fails, sending just the part
+of the page that looks like schedule data. It counts how many pages each
+tier handled and how long they took.
+
+For many pages, `extract_all()` runs the parser over every page and packs
+the leftovers into a few batched LLM requests (up to a token budget each)
+that use the provider's structured-output mode with a strict JSON schema,
+sent concurrently under the shared Groq rate limit.
+
+Usage:
+    extractor = TieredExtractor(llm_extract=extract_structured,
+                                batch_extract=extract_structured_batch)
+    data = extractor.extract(markdown_text, url)
+    results = extractor.extract_all({url: markdown_text, ...})
+    extractor.report()
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+
+from md_tables import iter_tables
+from scrape_engine import run_jobs
+
+MAX_LLM_CHARS = 12000
+BATCH_TOKEN_BUDGET = 6000   # estimated input tokens per batched LLM request
+
+STATION_HEADERS = ("station", "stn", "stop")
+ARRIVAL_HEADERS = ("arrival", "arr", "arrives", "sch arr")
+DEPARTURE_HEADERS = ("departure", "dep", "departs", "sch dep")
+DELAY_HEADERS = ("delay", "late")
+
+TRAIN_NUMBER_RE = re.compile(r"\b(\d{5})\b")
+TIME_RE = re.compile(r"\b\d{1,2}:\d{2}\b")
+
+# Site wording around the train name in headings and URL slugs, e.g.
+# "Running status of 12953" or "12953 August Kranti Rajdhani Train Schedule"
+NAME_BOILERPLATE = (r"(?:live|running|train|trains|status|schedule|time\s*table|timetable|route|"
+                    r"enquiry|timings?|spot|today|yesterday|erail|railyatri|of|for|and|the)")
+NAME_LEADING_RE = re.compile(rf"^(?:{NAME_BOILERPLATE}\b[\s\-–:|/,.]*)+", re.IGNORECASE)
+NAME_TRAILING_RE = re.compile(rf"(?:[\s\-–:|/,.]*\b{NAME_BOILERPLATE})+$", re.IGNORECASE)
+
+
+def _find_column(headers, names):
+    for index, header in enumerate(headers):
+        header = header.lower()
+        if any(name in header for name in names):
+            return index
+    return None
+
+
+def schedule_columns(headers):
+    """{header: "station" / "arrival" / "departure" / "delay"} for a table's headers.
+
+    Headers that match none of them (or a second column of the same kind)
+    are left out, so callers can keep them separately.
+    """
+    mapping = {}
+    for field, names in (("station", STATION_HEADERS), ("arrival", ARRIVAL_HEADERS),
+                         ("departure", DEPARTURE_HEADERS), ("delay", DELAY_HEADERS)):
+        index = _find_column([h if h not in mapping else "" for h in headers], names)
+        if index is not None:
+            mapping[headers[index]] = field
+    return mapping
+
+
+def clean_train_name(text, number=""):
+    """The train name in a heading or slug, without the number and site boilerplate"""
+    if number:
+        text = text.replace(number, " ")
+    text = " ".join(text.split()).strip(" -–:|/,.")
+    text = NAME_LEADING_RE.sub("", text)
+    text = NAME_TRAILING_RE.sub("", text).strip(" -–:|/,.")
+    # A real name has at least a couple of letters
+    return text if len(re.findall(r"[A-Za-z]", text)) >= 2 else ""
+
+
+def _train_identity(md_text, url=None):
+    """Train number and name from the page heading, falling back to the URL slug"""
+    number, name = "", ""
+    for line in md_text.splitlines():
+        if line.startswith("#"):
+            heading = line.lstrip("#").strip()
+            match = TRAIN_NUMBER_RE.search(heading)
+            if match:
+                number = match.group(1)
+                name = clean_train_name(heading, number)
+                break
+    if url:
+        slug = url.rstrip("/").rsplit("/", 1)[-1].split("?")[0]
+        if not number:
+            match = TRAIN_NUMBER_RE.search(url)
+            number = match.group(1) if match else ""
+        if not name:
+            # e.g. .../12953-august-kranti-rajdhani-express
+            name = clean_train_name(re.sub(r"[-_+]+", " ", slug), number).title()
+    return number, name
+
+
+def parse_schedule(md_text, url=None):
+    """Deterministic extraction from the first table that looks like a route"""
+    number, name = _train_identity(md_text, url)
+
+    for headers, _, rows in iter_tables(md_text, plain=True):
+        station = _find_column(headers, STATION_HEADERS)
+        arrival = _find_column(headers, ARRIVAL_HEADERS)
+        departure = _find_column(headers, DEPARTURE_HEADERS)
+        if station is None or (arrival is None and departure is None):
+            continue
+
+        def cell(row, index):
+            return row[index] if index is not None and index < len(row) else ""
+
+        route = [{"station": cell(row, station),
+                  "arrival": cell(row, arrival),
+                  "departure": cell(row, departure)}
+                 for row in rows if cell(row, station)]
+        return {"train_name": name, "train_number": number, "route": route}
+
+    return None
+
+
+def validate_schedule(data):
+    """True if `data` has a train number, a name and a non-empty timed route"""
+    if not isinstance(data, dict):
+        return False
+    if not TRAIN_NUMBER_RE.fullmatch(str(data.get("train_number", "")).strip()):
+        return False
+    # Heading boilerplate such as "Running status of" is not a name
+    if not clean_train_name(str(data.get("train_name", ""))):
+        return False
+    route = data.get("route")
+    if not isinstance(route, list) or not route:
+        return False
+    return all(isinstance(stop, dict) and stop.get("station") for stop in route) and any(
+        stop.get("arrival") or stop.get("departure") for stop in route
+    )
+
+
+def relevant_section(md_text, max_chars=MAX_LLM_CHARS):
+    """Only the headings, table rows and timed lines of a page, for the LLM"""
+    keep = []
+    for line in md_text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("#") or "|" in stripped or TIME_RE.search(stripped):
+            keep.append(stripped)
+    section = "\n".join(keep) or md_text
+    return section[:max_chars]
+
+
+STOP_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "station": {"type": "string"},
+        "arrival": {"type": "string"},
+        "departure": {"type": "string"},
+    },
+    "required": ["station", "arrival", "departure"],
+    "additionalProperties": False,
+}
+
+BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "pages": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "page_id": {"type": "string"},
+                    "train_name": {"type": "string"},
+                    "train_number": {"type": "string"},
+                    "route": {"type": "array", "items": STOP_SCHEMA},
+                },
+                "required": ["page_id", "train_name", "train_number", "route"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["pages"],
+    "additionalProperties": False,
+}
+
+# Strict schema enforcement needs a model with structured-output support;
+# for JSON-mode-only models use {"type": "json_object"} instead
+BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "train_schedules", "strict": True, "schema": BATCH_SCHEMA},
+}
+
+BATCH_SYSTEM_PROMPT = (
+    "You extract Indian Railways train schedules from scraped web pages. "
+    "Each page is delimited by <page id=\"...\"> tags. Return one entry per page "
+    "with its page_id, the train name, the 5-digit train number and every stop "
+    "of the route with arrival and departure times exactly as written "
+    "(empty string if missing)."
+)
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English/markdown
+    return len(text) // 4 + 1
+
+
+def make_batches(pages, token_budget=BATCH_TOKEN_BUDGET):
+    """Greedily pack (page_id, text) pairs into batches under the token budget"""
+    batches, current, used = [], [], 0
+    for page_id, text in pages:
+        cost = estimate_tokens(text)
+        if current and used + cost > token_budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append((page_id, text))
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def batch_prompt(batch):
+    return "\n\n".join(f'<page id="{page_id}">\n{text}\n</page>' for page_id, text in batch)
+
+
+def parse_batch_response(content, batch):
+    """Map the schema-constrained response back to {page_id: schedule}"""
+    wanted = {page_id for page_id, _ in batch}
+    results = {}
+    for page in json.loads(content).get("pages", []):
+        page_id = page.pop("page_id", None)
+        if page_id in wanted:
+            results[page_id] = page
+    return results
+
+
+class TieredExtractor:
+    """Parser first, LLM fallback, with per-tier counts and latency"""
+
+    def __init__(self, llm_extract=None, batch_extract=None, token_budget=BATCH_TOKEN_BUDGET):
+        self.llm_extract = llm_extract
+        self.batch_extract = batch_extract
+        self.token_budget = token_budget
+        self.stats = {tier: {"pages": 0, "seconds": 0.0} for tier in ("parser", "llm", "failed")}
+        self._lock = threading.Lock()
+
+    def _record(self, tier, started, pages=1, seconds=None):
+        if seconds is None:
+            seconds = time.perf_counter() - started
+        with self._lock:
+            self.stats[tier]["pages"] += pages
+            self.stats[tier]["seconds"] += seconds
+
+    def extract(self, md_text, url=None):
+        started = time.perf_counter()
+        data = parse_schedule(md_text, url)
+        if validate_schedule(data):
+            self._record("parser", started)
+            return data
+
+        if self.llm_extract is None:
+            self._record("failed", started)
+            raise ValueError(f"Parser could not extract a schedule from {url or 'page'}")
+
+        started = time.perf_counter()
+        try:
+            data = self.llm_extract(relevant_section(md_text))
+        except Exception:
+            self._record("failed", started)
+            raise
+        if not validate_schedule(data):
+            self._record("failed", started)
+            raise ValueError(f"LLM returned no valid schedule for {url or 'page'}")
+        self._record("llm", started)
+        return data
+
+    def extract_all(self, pages):
+        """Extract {url: markdown} pages, batching the LLM fallbacks.
+
+        Returns {url: schedule}; pages that no tier could handle are left out.
+        """
+        if self.batch_extract is None:
+            results = {}
+            for url, md_text in pages.items():
+                try:
+                    results[url] = self.extract(md_text, url)
+                except Exception as e:
+                    print(f"Extraction failed for {url}: {e}")
+            return results
+
+        results, leftovers = {}, []
+        for url, md_text in pages.items():
+            started = time.perf_counter()
+            data = parse_schedule(md_text, url)
+            if validate_schedule(data):
+                self._record("parser", started)
+                results[url] = data
+            else:
+                leftovers.append((f"p{len(leftovers)}", url, relevant_section(md_text)))
+
+        if not leftovers:
+            return results
+
+        urls = {page_id: url for page_id, url, _ in leftovers}
+        batches = make_batches([(page_id, text) for page_id, _, text in leftovers],
+                               self.token_budget)
+        def timed_batch(batch):
+            # Each batch's own duration; batches run concurrently
+            started = time.perf_counter()
+            try:
+                return self.batch_extract(batch), time.perf_counter() - started
+            except Exception as e:
+                e.seconds = time.perf_counter() - started
+                raise
+
+        outcomes = asyncio.run(run_jobs(batches, timed_batch, provider="groq",
+                                        on_progress=None))
+
+        for batch, outcome, error in outcomes:
+            extracted, seconds = outcome or ({}, getattr(error, "seconds", 0.0))
+            per_page = seconds / len(batch)
+            if error is not None:
+                print(f"Batch of {len(batch)} pages failed: {error}")
+            for page_id, _ in batch:
+                data = (extracted or {}).get(page_id)
+                # The strict schema still allows empty names and routes
+                if not validate_schedule(data):
+                    self._record("failed", None, seconds=per_page)
+                    print(f"No valid extraction for {urls[page_id]}")
+                else:
+                    self._record("llm", None, seconds=per_page)
+                    results[urls[page_id]] = data
+        return results
+
+    def report(self):
+        total = sum(tier["pages"] for tier in self.stats.values())
+        print(f"Extraction tiers ({total} pages):")
+        for name, tier in self.stats.items():
+            average = tier["seconds"] / tier["pages"] if tier["pages"] else 0.0
+            print(f"  {name:<7} {tier['pages']:>5} pages  avg {average * 1000:8.1f} ms")
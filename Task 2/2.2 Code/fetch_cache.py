@@ -0,0 +1,170 @@
+"""Fetch cache: skip pages that have not changed since the last run.
+
+For every URL we keep the origin's ETag/Last-Modified, a hash of the
+normalized page content and the result we parsed (or got from the LLM) for
+it, in a small SQLite database. Results are stored per `namespace`, so
+scrapers that extract different things from the same URL never read each
+other's entries.
+
+* Before scraping, `lookup(url)` sends a conditional HEAD request straight to
+  the site. A 304 means the page is unchanged and the stored result is
+  returned, so neither Firecrawl credits nor a browser visit are spent.
+  Nothing is sent for URLs with no stored result, and none for origins known
+  not to send validators; a stored page whose validators were never seen is
+  probed once to learn them.
+* After scraping, `get_or_extract(url, content, extract_fn)` hashes the
+  content. If the hash matches the stored one the previous result is reused
+  and `extract_fn` (e.g. the Groq LLM call) is not run.
+
+Usage:
+    cache = FetchCache(namespace="schedules")
+    data = cache.lookup(url)
+    if data is None:
+        text = firecrawl.scrape(url=url).markdown
+        data = cache.get_or_extract(url, text, extract_structured)
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+import requests
+
+DB_PATH = "fetch_cache.db"
+PROBE_TIMEOUT = 10
+
+# Parts of a page that change on every load without the data changing
+VOLATILE_PATTERNS = [
+    re.compile(r"^\W*(last\s+)?updated\b.*$", re.IGNORECASE | re.MULTILINE),
+    re.compile(r"\b\d{1,2}:\d{2}(:\d{2})?\s*(am|pm)?\s*(ist)?\s+(today|ago)\b", re.IGNORECASE),
+    re.compile(r"\b\d+\s+(seconds?|minutes?|mins?)\s+ago\b", re.IGNORECASE),
+]
+
+
+def normalize_content(text):
+    """Drop volatile fragments and collapse whitespace before hashing"""
+    for pattern in VOLATILE_PATTERNS:
+        text = pattern.sub("", text)
+    return " ".join(text.split())
+
+
+def content_hash(text):
+    return hashlib.sha256(normalize_content(text).encode("utf-8")).hexdigest()
+
+
+class FetchCache:
+    """Per-URL validators, content hash and extracted result, stored in SQLite.
+
+    Validators are NULL until the origin has been probed and "" if it sent none.
+    """
+
+    def __init__(self, path=DB_PATH, namespace="default"):
+        self.path = path
+        self.namespace = namespace
+        # Validators seen by lookup() that belong to content not stored yet
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        conn = self._connect()
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(pages)")]
+        if columns and "namespace" not in columns:
+            # Cache from before namespaces: its entries cannot be told apart
+            conn.execute("DROP TABLE pages")
+        conn.execute('''CREATE TABLE IF NOT EXISTS pages
+                        (namespace TEXT NOT NULL,
+                         url TEXT NOT NULL,
+                         etag TEXT,
+                         last_modified TEXT,
+                         content_hash TEXT,
+                         result TEXT,
+                         fetched_at TEXT,
+                         PRIMARY KEY (namespace, url))''')
+        conn.commit()
+        conn.close()
+
+    def _connect(self):
+        # One connection per call, so scrape jobs can use the cache from threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, url):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT etag, last_modified, content_hash, result FROM pages "
+            "WHERE namespace = ? AND url = ?",
+            (self.namespace, url),
+        ).fetchone()
+        conn.close()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1],
+                "content_hash": row[2], "result": json.loads(row[3])}
+
+    def store(self, url, content, result, fallback=None):
+        """Save a result; validators come from lookup(), else from `fallback`"""
+        with self._lock:
+            validators = self._pending.pop(url, None) or fallback or {}
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self.namespace, url, validators.get("etag"), validators.get("last_modified"),
+             content_hash(content), json.dumps(result, default=str),
+             datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        )
+        conn.commit()
+        conn.close()
+
+    def lookup(self, url):
+        """Return the stored result if the origin reports the page unchanged"""
+        cached = self.get(url)
+        # Nothing to return even on a 304, so don't spend a request on it
+        if cached is None:
+            return None
+        # Probed before and the origin sends no validators: a HEAD cannot tell
+        if cached["etag"] == "" and cached["last_modified"] == "":
+            return None
+
+        headers = {}
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            response = requests.head(url, headers=headers, timeout=PROBE_TIMEOUT,
+                                     allow_redirects=True)
+        except requests.RequestException:
+            return None
+
+        if response.status_code == 304:
+            self.hits += 1
+            return cached["result"]
+
+        # Keep the new validators until the fresh content is stored with them
+        with self._lock:
+            self._pending[url] = {"etag": response.headers.get("ETag") or "",
+                                  "last_modified": response.headers.get("Last-Modified") or ""}
+        return None
+
+    def cached_result(self, url, content):
+        """Return the stored result if `content` hashes the same as last time"""
+        cached = self.get(url)
+        if cached and cached["content_hash"] == content_hash(content):
+            self.hits += 1
+            # Refresh validators/timestamp so the next lookup() can return a 304
+            self.store(url, content, cached["result"], fallback=cached)
+            return cached["result"]
+        self.misses += 1
+        return None
+
+    def get_or_extract(self, url, content, extract_fn):
+        """Reuse the stored result if the content is unchanged, else extract and store"""
+        result = self.cached_result(url, content)
+        if result is None:
+            result = extract_fn(content)
+            self.store(url, content, result)
+        return result
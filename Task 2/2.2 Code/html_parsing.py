@@ -0,0 +1,121 @@
+"""HTML parsing layer with fast C-backed parsers and targeted extraction.
+
+`BeautifulSoup(..., "html.parser")` is the slowest way to parse HTML in
+Python. This module picks the fastest backend that is installed and offers
+"parse only what you need" helpers for the two things the scrapers look at,
+tables and links:
+
+    selectolax  - Lexbor/Modest C parser, CSS selectors      (pip install selectolax)
+    lxml        - libxml2 via lxml.html, XPath                (pip install lxml)
+    bs4-lxml    - BeautifulSoup on the lxml tree builder
+    bs4         - BeautifulSoup with the pure-Python html.parser
+
+With the BeautifulSoup backends a SoupStrainer restricts tree building to the
+target elements, so the rest of the document is never turned into objects.
+
+Usage:
+    tables = parse_tables(html)            # [(headers, rows), ...]
+    links = parse_links(html)              # [(href, text), ...]
+    soup = BeautifulSoup(html, bs4_features())
+"""
+
+import importlib.util
+
+BACKENDS = ("selectolax", "lxml", "bs4-lxml", "bs4")
+
+
+def _installed(module):
+    return importlib.util.find_spec(module) is not None
+
+
+def available_backends():
+    """Installed backends, fastest first"""
+    has_lxml = _installed("lxml")
+    has_bs4 = _installed("bs4")
+    found = {
+        "selectolax": _installed("selectolax"),
+        "lxml": has_lxml,
+        "bs4-lxml": has_bs4 and has_lxml,
+        "bs4": has_bs4,
+    }
+    return [backend for backend in BACKENDS if found[backend]]
+
+
+def best_backend():
+    backends = available_backends()
+    if not backends:
+        raise ImportError("No HTML parser installed: pip install selectolax (or lxml / beautifulsoup4)")
+    return backends[0]
+
+
+def bs4_features():
+    """Fastest tree builder for code that needs a BeautifulSoup object"""
+    return "lxml" if _installed("lxml") else "html.parser"
+
+
+def _soup(content, backend, only=None):
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    features = "lxml" if backend == "bs4-lxml" else "html.parser"
+    return BeautifulSoup(content, features, parse_only=SoupStrainer(only) if only else None)
+
+
+def parse_document(content, backend=None):
+    """Full parse of a document with the given (or best) backend"""
+    backend = backend or best_backend()
+    if backend == "selectolax":
+        from selectolax.parser import HTMLParser
+        return HTMLParser(content)
+    if backend == "lxml":
+        import lxml.html
+        return lxml.html.fromstring(content)
+    return _soup(content, backend)
+
+
+def parse_tables(content, backend=None):
+    """[(headers, rows)] for every <table>; rows without <td> cells are skipped"""
+    backend = backend or best_backend()
+    tables = []
+
+    if backend == "selectolax":
+        from selectolax.parser import HTMLParser
+        for table in HTMLParser(content).css("table"):
+            headers = [th.text(strip=True) for th in table.css("th")]
+            rows = [[td.text(strip=True) for td in tr.css("td")] for tr in table.css("tr")]
+            tables.append((headers, [row for row in rows if row]))
+
+    elif backend == "lxml":
+        import lxml.html
+        for table in lxml.html.fromstring(content).iter("table"):
+            headers = [th.text_content().strip() for th in table.iter("th")]
+            rows = [[td.text_content().strip() for td in tr.iter("td")] for tr in table.iter("tr")]
+            tables.append((headers, [row for row in rows if row]))
+
+    else:
+        # Only <table> subtrees are built
+        for table in _soup(content, backend, only="table").find_all("table"):
+            headers = [th.get_text(strip=True) for th in table.find_all("th")]
+            rows = [[td.get_text(strip=True) for td in tr.find_all("td")]
+                    for tr in table.find_all("tr")]
+            tables.append((headers, [row for row in rows if row]))
+
+    return tables
+
+
+def parse_links(content, backend=None):
+    """[(href, text)] for every <a href=...>"""
+    backend = backend or best_backend()
+
+    if backend == "selectolax":
+        from selectolax.parser import HTMLParser
+        return [(a.attributes.get("href"), a.text(strip=True))
+                for a in HTMLParser(content).css("a[href]")]
+
+    if backend == "lxml":
+        import lxml.html
+        return [(a.get("href"), a.text_content().strip())
+                for a in lxml.html.fromstring(content).xpath("//a[@href]")]
+
+    # Only <a> tags are built
+    return [(a["href"], a.get_text(strip=True))
+            for a in _soup(content, backend, only="a").find_all("a", href=True)]
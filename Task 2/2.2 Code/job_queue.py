@@ -0,0 +1,288 @@
+"""Durable, resumable scrape job queue backed by SQLite.
+
+Every URL is a row with its state (pending / in_progress / done / failed),
+attempt count and the earliest time it may be retried. Workers claim URLs
+under a lease, so several processes on one machine can share the same
+database file; a lease left behind by a crashed worker simply expires and the
+URL is picked up again. Failed attempts are retried with exponential backoff
+until `max_attempts`, after which the URL stays `failed`.
+
+Jobs belong to a run (e.g. the crawl date). Restarting a script after a crash
+continues exactly where that run stopped: URLs already `done` are skipped and
+adding the same URL twice is a no-op. A new `run_id` starts every URL from
+scratch, so tomorrow's crawl scrapes everything again. Resume an interrupted
+run by its id, e.g. the one `latest_unfinished_run()` returns, rather than
+deriving the id from the clock again.
+
+Leases are renewed in the background while a chunk is being processed, so
+slow chunks (rate-limit retries, LLM batches) are not claimed twice.
+
+Usage:
+    run_id = latest_unfinished_run("train_jobs.db") or date.today().isoformat()
+    queue = JobQueue("train_jobs.db", run_id=run_id)
+    resuming = queue.has_jobs()      # check before add(): was this run started?
+    queue.add(train_urls)
+    with RowSink("trains.csv", append=resuming) as sink:
+        process_queue(queue, scrape_train, on_result=lambda url, rows: sink.write_many(rows))
+    print(queue.counts())
+"""
+
+import asyncio
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+
+from scrape_engine import run_jobs
+
+DB_PATH = "scrape_jobs.db"
+MAX_ATTEMPTS = 5
+LEASE_SECONDS = 300
+BACKOFF_BASE = 30     # seconds before the first retry, doubled per attempt
+BACKOFF_MAX = 3600
+MAX_IDLE_WAIT = 60    # longest single sleep while waiting for retries/leases
+
+PENDING, IN_PROGRESS, DONE, FAILED = "pending", "in_progress", "done", "failed"
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def latest_unfinished_run(path=DB_PATH):
+    """Id of the most recently active run that still has pending or leased URLs"""
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        row = conn.execute(
+            """SELECT run_id FROM jobs WHERE state IN (?, ?)
+               GROUP BY run_id ORDER BY MAX(updated_at) DESC LIMIT 1""",
+            (PENDING, IN_PROGRESS),
+        ).fetchone()
+    except sqlite3.OperationalError:
+        row = None   # no queue created yet
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+class JobQueue:
+    """Per-URL scrape state of one run, shared by all workers using the same file"""
+
+    def __init__(self, path=DB_PATH, run_id="", max_attempts=MAX_ATTEMPTS,
+                 lease_seconds=LEASE_SECONDS):
+        self.path = path
+        self.run_id = str(run_id)
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''CREATE TABLE IF NOT EXISTS jobs
+                        (run_id TEXT NOT NULL,
+                         url TEXT NOT NULL,
+                         state TEXT NOT NULL,
+                         attempts INTEGER NOT NULL DEFAULT 0,
+                         next_attempt_at REAL NOT NULL DEFAULT 0,
+                         lease_owner TEXT,
+                         lease_expires REAL,
+                         last_error TEXT,
+                         updated_at REAL,
+                         PRIMARY KEY (run_id, url))''')
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (run_id, state, next_attempt_at)")
+        conn.close()
+
+    def _connect(self):
+        # Autocommit mode; claims open their own BEGIN IMMEDIATE transaction
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def has_jobs(self):
+        """True if this run already has URLs, i.e. it is being resumed"""
+        conn = self._connect()
+        row = conn.execute("SELECT 1 FROM jobs WHERE run_id = ? LIMIT 1", (self.run_id,)).fetchone()
+        conn.close()
+        return row is not None
+
+    def add(self, urls):
+        """Queue URLs that are not known in this run yet; returns how many were added"""
+        now = time.time()
+        conn = self._connect()
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO jobs (run_id, url, state, updated_at) VALUES (?, ?, ?, ?)",
+            [(self.run_id, url, PENDING, now) for url in dict.fromkeys(urls)],
+        )
+        added = conn.total_changes - before
+        conn.close()
+        return added
+
+    def claim(self, worker_id, limit=1):
+        """Lease up to `limit` runnable URLs to a worker"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock up front, so two workers can
+            # never select the same rows
+            conn.execute("BEGIN IMMEDIATE")
+            urls = [row[0] for row in conn.execute(
+                """SELECT url FROM jobs
+                   WHERE run_id = ?
+                     AND ((state = ? AND next_attempt_at <= ?)
+                          OR (state = ? AND lease_expires <= ?))
+                   ORDER BY next_attempt_at, url
+                   LIMIT ?""",
+                (self.run_id, PENDING, now, IN_PROGRESS, now, limit),
+            )]
+            conn.executemany(
+                """UPDATE jobs SET state = ?, lease_owner = ?, lease_expires = ?, updated_at = ?
+                   WHERE run_id = ? AND url = ?""",
+                [(IN_PROGRESS, worker_id, now + self.lease_seconds, now, self.run_id, url)
+                 for url in urls],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return urls
+
+    def renew(self, urls, worker_id):
+        """Extend the lease on URLs this worker still holds"""
+        now = time.time()
+        conn = self._connect()
+        conn.executemany(
+            """UPDATE jobs SET lease_expires = ?, updated_at = ?
+               WHERE run_id = ? AND url = ? AND state = ? AND lease_owner = ?""",
+            [(now + self.lease_seconds, now, self.run_id, url, IN_PROGRESS, worker_id)
+             for url in urls],
+        )
+        conn.close()
+
+    def complete(self, url, worker_id):
+        """Mark a URL done; False if this worker no longer held its lease"""
+        conn = self._connect()
+        cursor = conn.execute(
+            """UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL,
+                               last_error = NULL, updated_at = ?
+               WHERE run_id = ? AND url = ? AND lease_owner = ?""",
+            (DONE, time.time(), self.run_id, url, worker_id),
+        )
+        conn.close()
+        return cursor.rowcount > 0
+
+    def fail(self, url, worker_id, error):
+        """Record a failed attempt and schedule the retry (or give up)"""
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute("SELECT attempts FROM jobs WHERE run_id = ? AND url = ? AND lease_owner = ?",
+                           (self.run_id, url, worker_id)).fetchone()
+        if row is not None:
+            attempts = row[0] + 1
+            delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX) * (1 + random.random() / 4)
+            state = FAILED if attempts >= self.max_attempts else PENDING
+            conn.execute(
+                """UPDATE jobs SET state = ?, attempts = ?, next_attempt_at = ?,
+                                   lease_owner = NULL, lease_expires = NULL,
+                                   last_error = ?, updated_at = ?
+                   WHERE run_id = ? AND url = ?""",
+                (state, attempts, now + delay, str(error)[:500], now, self.run_id, url),
+            )
+        conn.close()
+
+    def seconds_until_next(self):
+        """Time until a URL may become claimable, or None if nothing is left"""
+        conn = self._connect()
+        row = conn.execute(
+            """SELECT MIN(CASE WHEN state = ? THEN next_attempt_at ELSE lease_expires END)
+               FROM jobs WHERE run_id = ? AND state IN (?, ?)""",
+            (PENDING, self.run_id, PENDING, IN_PROGRESS),
+        ).fetchone()
+        conn.close()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def counts(self):
+        conn = self._connect()
+        counts = dict(conn.execute("SELECT state, COUNT(*) FROM jobs WHERE run_id = ? GROUP BY state",
+                                   (self.run_id,)))
+        conn.close()
+        return {state: counts.get(state, 0) for state in (PENDING, IN_PROGRESS, DONE, FAILED)}
+
+    def failures(self):
+        """(url, attempts, last_error) of every URL in this run that ran out of attempts"""
+        conn = self._connect()
+        rows = conn.execute("SELECT url, attempts, last_error FROM jobs WHERE run_id = ? AND state = ?",
+                            (self.run_id, FAILED)).fetchall()
+        conn.close()
+        return rows
+
+    def requeue(self, states=(DONE, FAILED)):
+        """Make this run's finished URLs pending again (attempts reset)"""
+        conn = self._connect()
+        conn.execute(
+            f"""UPDATE jobs SET state = ?, attempts = 0, next_attempt_at = 0, last_error = NULL
+                WHERE run_id = ? AND state IN ({",".join("?" * len(states))})""",
+            (PENDING, self.run_id, *states),
+        )
+        conn.close()
+
+
+def _renew_leases(queue, urls, worker_id, stop):
+    while not stop.wait(queue.lease_seconds / 3):
+        queue.renew(urls, worker_id)
+
+
+def consume_chunks(queue, handle_chunk, chunk_size=10, worker_id=None):
+    """Claim URLs chunk by chunk until the queue is drained.
+
+    `handle_chunk(urls)` processes a list of URLs and returns {url: error}
+    for the ones that failed; every other URL in the chunk is marked done.
+    """
+    worker_id = worker_id or default_worker_id()
+    while True:
+        urls = queue.claim(worker_id, chunk_size)
+        if not urls:
+            wait = queue.seconds_until_next()
+            if wait is None:
+                break
+            time.sleep(min(wait, MAX_IDLE_WAIT) + 0.1)
+            continue
+
+        # Keep the leases alive for as long as the chunk takes
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=_renew_leases, args=(queue, urls, worker_id, stop),
+                                     daemon=True)
+        heartbeat.start()
+        try:
+            errors = handle_chunk(urls) or {}
+        except Exception as e:
+            errors = {url: e for url in urls}
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        for url in urls:
+            if url in errors:
+                print(f"Failed {url}: {errors[url]}")
+                queue.fail(url, worker_id, errors[url])
+            elif not queue.complete(url, worker_id):
+                print(f"Lease on {url} was lost; another worker may process it again")
+
+    print("Queue:", queue.counts())
+
+
+def process_queue(queue, scrape_fn, provider="firecrawl", on_result=None,
+                  chunk_size=10, worker_id=None):
+    """Run `scrape_fn(url)` on the engine for every queued URL.
+
+    `on_result(url, result)` is called as each URL succeeds, before it is
+    marked done, so results are never lost (at worst written twice).
+    """
+    def handle_chunk(urls):
+        outcomes = asyncio.run(run_jobs(urls, scrape_fn, provider, on_result=on_result))
+        return {url: error for url, _, error in outcomes if error is not None}
+
+    consume_chunks(queue, handle_chunk, chunk_size, worker_id)
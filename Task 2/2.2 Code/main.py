@@ -1,4 +1,6 @@
 import requests
+from datetime import date, timedelta
+from status_store import StatusStore, stops_from_rapidapi
 
 # 1. SETUP: Define the endpoint URL
 url = "https://irctc1.p.rapidapi.com/api/v1/liveTrainStatus"
@@ -29,6 +31,14 @@ try:
         data = response.json()
         print("--- API Response ---")
         print(data)
+
+        # 5. STORE: Keep only the fields that changed since the previous poll
+        stops, current_station, delay = stops_from_rapidapi(data)
+        journey_date = (data.get("data") or {}).get("train_start_date") or \
+            (date.today() - timedelta(days=int(query_params["startDay"]))).isoformat()
+        changed = StatusStore().ingest(query_params["trainNo"], journey_date, stops,
+                                       current_station, delay)
+        print(f"{changed} fields changed since the last poll")
     else:
         print(f"Error: {response.status_code}")
         print(response.text)
@@ -31,8 +31,8 @@ docs = firecrawl.crawl(url="https://www.railyatri.in/trains/seat-availability/12
 print(docs)
 
 from firecrawl import Firecrawl
-import pandas as pd
-import time
+from scrape_engine import scrape_all
+from output_sink import RowSink
 
 # ----------------------------
 # Initialize Firecrawl
@@ -48,105 +48,112 @@ train_urls = [
     # Add more train URLs here
 ]
 
-all_data = []
-
-# ----------------------------
-# Loop through each train
-# ----------------------------
-for url in train_urls:
-    # Introduce delay BEFORE making the API call to respect rate limits
-    time.sleep(21) # Ensures at least 20 seconds between calls for a 3 req/min limit
-    print(f"Scraping: {url}")
-    try:
-        # Start crawl
-        job = firecrawl.crawl(url=url, limit=10)
-
-        # Get results (list of Document objects) from job.data
-        documents = job.data
+def crawl_train(url):
+    # Start crawl and get results (list of Document objects) from job.data
+    job = firecrawl.crawl(url=url, limit=10)
+    return job.data or []
 
-        if documents:
-            # Flatten results if nested or process each Document object
-            for doc_obj in documents:
-                # Each doc_obj is a Document object. You can access its attributes.
-                # For now, let's append the whole Document object.
-                # If this causes issues with DataFrame, we'll extract specific fields.
-                all_data.append(doc_obj)
-
-    except Exception as e:
-        print(f"Error scraping {url}: {e}")
+def save_documents(url, documents):
+    # Each doc_obj is a Document object; write its fields as one row
+    sink.write_many(doc_obj.model_dump() if hasattr(doc_obj, "model_dump") else vars(doc_obj)
+                    for doc_obj in documents)
 
 # ----------------------------
-# Save all results to CSV
+# Crawl all trains concurrently, saving each as it finishes
 # ----------------------------
-if all_data:
-    df = pd.DataFrame(all_data)
-    df.to_csv("all_trains_firecrawl.csv", index=False)
+# The engine keeps us at the "firecrawl_crawl" limit in scrape_engine.PROVIDER_LIMITS
+# (3 req/min) instead of sleeping a fixed 21 seconds before every call
+# Document fields beyond the first document's go into "extra" rather than being lost
+with RowSink("all_trains_firecrawl.csv", extra_column="extra") as sink:
+    scrape_all(train_urls, crawl_train, provider="firecrawl_crawl", on_result=save_documents)
+
+if sink.rows_written:
     print(" All train data saved to all_trains_firecrawl.csv")
 else:
     print("No data scraped.")
 
-# !pip install firecrawl-py pandas beautifulsoup4 markdown
+# !pip install firecrawl-py pandas
 
 from firecrawl import Firecrawl
 import pandas as pd
-from bs4 import BeautifulSoup
-import markdown
+from datetime import date, timedelta
+from md_tables import first_table
+from fetch_cache import FetchCache
+from extraction import schedule_columns
+from output_sink import STATION_TABLE_COLUMNS, RowSink
+from status_store import StatusStore, current_from_stops, journey_date_from_text, normalize_stop
 
 firecrawl = Firecrawl(api_key="USE API KEY")
 
 # 1. List of train numbers you want to scrape
 train_numbers = ["12953", "12954", "12009"]
 
-all_rows = []
+# Used when a page does not show the journey's start date:
+# 0 = trains that started today, 1 = yesterday (like startDay in main.py)
+START_DAY = 0
 
 def extract_table_from_markdown(md_text):
-    """Converts markdown -> HTML -> tables -> DataFrame"""
-    try:
-        html = markdown.markdown(md_text, extensions=['tables'])
-        soup = BeautifulSoup(html, "html.parser")
-
-        table = soup.find("table")
-        if table is None:
-            return None
-
-        rows = []
-        headers = [th.get_text(strip=True) for th in table.find_all("th")]
-
-        for tr in table.find_all("tr")[1:]:
-            cells = [td.get_text(strip=True) for td in tr.find_all("td")]
-            if cells:
-                rows.append(cells)
+    """First markdown pipe table -> DataFrame (single pass, no HTML round trip)"""
+    table = first_table(md_text, plain=True)
+    if table is None:
+        return None
+    return pd.DataFrame(table.rows, columns=table.headers)
 
-        return pd.DataFrame(rows, columns=headers)
 
-    except Exception as e:
-        print("Failed to parse markdown:", e)
+def table_records(md_text):
+    """extract_table_from_markdown() result in a JSON-friendly form for the fetch cache"""
+    df = extract_table_from_markdown(md_text)
+    if df is None:
         return None
+    # Kept with the table so pages served from the cache still know their journey
+    return {"columns": list(df.columns), "rows": df.values.tolist(),
+            "journey_date": journey_date_from_text(md_text)}
 
+# Own namespace: the Groq pipeline below caches schedules for the same URLs
+fetch_cache = FetchCache(namespace="erail_tables")
+# Running-status history: only changed times/delays are stored per poll
+status_store = StatusStore()
 
 # 2. Loop through train pages
-for t in train_numbers:
-    url = f"https://erail.in/train-running-status/{t}"
-    print("Scraping train:", t)
-
-    docs = firecrawl.scrape(url)
-
-    md = docs.markdown
-    if not md:
-        print("No markdown found for", t)
-        continue
-
-    df = extract_table_from_markdown(md)
-    if df is not None:
-        df["train_number"] = t
-        all_rows.append(df)
-    else:
-        print("No table extracted for", t)
+# Rows are appended to erail_trains.csv as each train is parsed. Tables differ
+# per train, so station/arrival/departure/delay get fixed columns and every
+# other column is kept as JSON in "extra". The last batch is flushed on exit,
+# even if a train raises
+with RowSink("erail_trains.csv", ["train_number", *STATION_TABLE_COLUMNS],
+             extra_column="extra") as sink:
+    for t in train_numbers:
+        url = f"https://erail.in/train-running-status/{t}"
+        print("Scraping train:", t)
+
+        # Unchanged pages reuse the last run's table without a Firecrawl call
+        table = fetch_cache.lookup(url)
+        if table is None:
+            docs = firecrawl.scrape(url)
+
+            md = docs.markdown
+            if not md:
+                print("No markdown found for", t)
+                continue
+
+            table = fetch_cache.get_or_extract(url, md, table_records)
+
+        if table is not None:
+            rows = [dict(zip(table["columns"], row)) for row in table["rows"]]
+            names = schedule_columns(table["columns"])
+            sink.write_many({"train_number": t, **{names.get(k, k): v for k, v in row.items()}}
+                            for row in rows)
+            # Keyed by the journey's start date, not the poll date, so a train running
+            # past midnight keeps one history
+            journey_date = table.get("journey_date") or \
+                (date.today() - timedelta(days=START_DAY)).isoformat()
+            stops = [normalize_stop(row) for row in rows]
+            # The page has no separate summary; the last stop reached stands in for it
+            current_station, delay = current_from_stops(stops)
+            status_store.ingest(t, journey_date, stops, current_station, delay)
+        else:
+            print("No table extracted for", t)
 
-# 3. Combine all
-if all_rows:
-    final_df = pd.concat(all_rows, ignore_index=True)
-    final_df.to_csv("erail_trains.csv", index=False)
+if sink.rows_written:
     print("\nSaved → erail_trains.csv")
 else:
     print("No data extracted.")
@@ -158,6 +165,14 @@ from groq import Groq
 import pandas as pd
 import json
 import re # Import the regular expression module
+import asyncio
+from datetime import date
+from scrape_engine import get_limiter, run_jobs
+from job_queue import JobQueue, consume_chunks, latest_unfinished_run
+from fetch_cache import FetchCache
+from extraction import (BATCH_RESPONSE_FORMAT, BATCH_SYSTEM_PROMPT, TieredExtractor,
+                        batch_prompt, parse_batch_response)
+from output_sink import SCHEDULE_COLUMNS, RowSink, read_sink
 
 firecrawl = Firecrawl(api_key="USE API KEY")
 # groq_client = Groq(api_key="YOUR_GROQ_API_KEY")
@@ -180,10 +195,12 @@ def extract_structured(text):
     Return ONLY JSON.
     """
 
-    res = groq_client.chat.completions.create(
-        model="llama-3.3-70b-versatile", # Updated to an active model from the list
-        messages=[{"role": "user", "content": prompt}]
-    )
+    # Shared Groq limiter, since several scrape jobs call the LLM at once
+    with get_limiter("groq"):
+        res = groq_client.chat.completions.create(
+            model="llama-3.3-70b-versatile", # Updated to an active model from the list
+            messages=[{"role": "user", "content": prompt}]
+        )
 
     model_output = res.choices[0].message.content
 
@@ -211,29 +228,83 @@ def extract_structured(text):
             else:
                 raise ValueError(f"No valid JSON found in model output.\nOriginal output: {model_output}")
 
+def extract_structured_batch(batch):
+    """One Groq request for several (page_id, text) pages, schema-constrained JSON"""
+    res = groq_client.chat.completions.create(
+        model="openai/gpt-oss-120b", # Supports strict json_schema output on Groq
+        messages=[
+            {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": batch_prompt(batch)},
+        ],
+        response_format=BATCH_RESPONSE_FORMAT,
+        temperature=0,
+    )
+    return parse_batch_response(res.choices[0].message.content, batch)
+
+fetch_cache = FetchCache(namespace="schedules")
+# Markdown table parser first; pages it cannot handle go to Groq in batches
+extractor = TieredExtractor(llm_extract=extract_structured,
+                            batch_extract=extract_structured_batch)
+
 def scrape_train(url):
+    """Returns (url, data, markdown); data is None if the page still needs extracting"""
     print("Scraping:", url)
 
+    # Page unchanged at the origin (304): no scrape, no LLM call
+    data = fetch_cache.lookup(url)
+    if data is not None:
+        print("Unchanged:", url)
+        return url, data, None
+
     doc = firecrawl.scrape(url=url)
     text = doc.markdown or ""
 
     if not text:
         raise ValueError("Empty page content or markdown not available.")
 
-    data = extract_structured(text)
-    return data
-
-def scrape_multiple(train_urls):
-    all_data = []
-
-    for url in train_urls:
-        try:
-            data = scrape_train(url)
-            all_data.append(data)
-        except Exception as e:
-            print("Error:", e)
-
-    return all_data
+    # Same content as last time: reuse the previous extraction
+    return url, fetch_cache.cached_result(url, text), text
+
+def route_rows(data):
+    """One row per stop, in the SCHEDULE_COLUMNS layout"""
+    for stop in data.get("route") or []:
+        yield {**stop, "train_name": data.get("train_name"),
+               "train_number": data.get("train_number")}
+
+def scrape_chunk(urls, sink):
+    """Scrape, extract and save a chunk of claimed URLs; returns {url: error}"""
+    # Runs scrape_train concurrently within the Firecrawl quota
+    outcomes = asyncio.run(run_jobs(urls, scrape_train, provider="firecrawl"))
+    errors = {url: error for url, _, error in outcomes if error is not None}
+    scraped = [result for _, result, error in outcomes if error is None]
+
+    # Extract all new/changed pages together so LLM fallbacks share requests
+    extracted = extractor.extract_all({url: text for url, data, text in scraped if data is None})
+
+    for url, data, text in scraped:
+        if data is None:
+            data = extracted.get(url)
+            if data is None:
+                errors[url] = "No schedule extracted"
+                continue
+            fetch_cache.store(url, text, data)
+        sink.write_many(route_rows(data))
+
+    # Rows must be on disk before the queue marks these URLs done
+    sink.flush()
+    return errors
+
+# Per-URL state lives in SQLite, one run per crawl: rerunning after a crash
+# resumes the interrupted run (even past midnight) with the URLs that are not
+# done yet, failed ones retried with backoff; once a run has finished, the next
+# one is named after the day and scrapes every URL again
+RUN_ID = None   # set, e.g. "2026-10-19", to resume or start a specific run
+run_id = RUN_ID or latest_unfinished_run("train_jobs.db") or date.today().isoformat()
+queue = JobQueue("train_jobs.db", run_id=run_id)
+
+def scrape_multiple(train_urls, sink):
+    queue.add(train_urls)
+    consume_chunks(queue, lambda urls: scrape_chunk(urls, sink))
 
 train_urls = [
     "https://erail.in/train-running-status/12953",
@@ -241,14 +312,17 @@ train_urls = [
     "https://erail.in/train-running-status/12951",
 ]
 
-data = scrape_multiple(train_urls)
-
-df = pd.json_normalize(data, record_path='route',
-                       meta=['train_name', 'train_number'])
+# A new run starts trains.csv afresh; resuming today's run appends, so rows
+# saved before an interruption are kept
+# Stop fields outside SCHEDULE_COLUMNS (platform, day, ...) are kept in "extra"
+resuming = queue.has_jobs()
+with RowSink("trains.csv", columns=SCHEDULE_COLUMNS, append=resuming, extra_column="extra") as sink:
+    scrape_multiple(train_urls, sink)
+extractor.report()
 
-df.to_csv("trains.csv", index=False)
+print(f"Saved {sink.rows_written} new rows \u2192 trains.csv")
 
-print("Saved \u2192 trains.csv")
+df = read_sink("trains.csv")
 
 import pandas as pd
 display(df.sample(5))
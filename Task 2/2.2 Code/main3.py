@@ -13,6 +13,7 @@ web = requests.get("http://127.0.0.1:5500/index.html")
 #  html parsing
 
 from bs4 import BeautifulSoup
+from html_parsing import bs4_features
 
 # kinds of objects in beautiful soup
 # 1. BeautifulSoup
@@ -22,7 +23,9 @@ from bs4 import BeautifulSoup
 
 # _______________________________________________________________________________________
 
-soup = BeautifulSoup(web.content, "html.parser")
+# bs4_features() picks the C-backed "lxml" tree builder when it is installed,
+# falling back to the pure-Python "html.parser"
+soup = BeautifulSoup(web.content, bs4_features())
 
 # print(soup.title)
 # print(soup.prettify)
@@ -86,7 +89,8 @@ print(type(comment)) # it will show that the type is comment
 
 
 # Example of web scrapping
-apple = BeautifulSoup(web.content, 'html.parser') # html.parser is used 
+apple = soup # reuse the tree parsed above instead of parsing web.content a second time
+# (for bulk scraping, html_parsing.parse_links(web.content) builds only the <a> tags)
 
 # print(apple.prettify()) # prints the html code in a structured way
 
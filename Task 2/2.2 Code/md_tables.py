@@ -0,0 +1,134 @@
+"""Single-pass markdown pipe-table parser shared by all scrapers.
+
+Firecrawl returns pages as markdown, and the schedules we want are pipe
+tables in it. Instead of converting markdown -> HTML -> BeautifulSoup (or
+re-splitting and regex-matching every line), `iter_tables()` walks the lines
+once and yields every table with its headers, column alignments and rows.
+
+* Escaped pipes (`\\|`) stay inside their cell.
+* Leading/trailing pipes are optional, as in GitHub-flavoured markdown.
+* Ragged rows are padded with "" or cut to the header width.
+* `plain=True` strips inline markup (links, emphasis, code, <br>) from
+  cells, giving the same text BeautifulSoup's get_text() used to.
+
+Usage:
+    for table in iter_tables(md_text):
+        df = pd.DataFrame(table.rows, columns=table.headers)
+"""
+
+import re
+from collections import namedtuple
+
+Table = namedtuple("Table", ["headers", "alignments", "rows"])
+
+SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+
+# (marker that must be present, pattern, replacement)
+INLINE_PATTERNS = [
+    ("![", re.compile(r"!\[([^\]]*)\]\([^)]*\)"), ""),         # images
+    ("](", re.compile(r"\[([^\]]*)\]\([^)]*\)"), r"\1"),       # links -> text
+    ("<", re.compile(r"<br\s*/?>", re.IGNORECASE), " "),
+    ("<", re.compile(r"<[^>]+>"), ""),                         # other inline HTML
+    ("*", re.compile(r"(\*\*|\*)(?=\S)(.+?)(?<=\S)\1"), r"\2"),
+    ("_", re.compile(r"(?<!\w)(__|_)(?=\S)(.+?)(?<=\S)\1(?!\w)"), r"\2"),  # not snake_case
+    ("`", re.compile(r"`([^`]*)`"), r"\1"),
+    ("~~", re.compile(r"~~(.+?)~~"), r"\1"),
+]
+
+
+def split_cells(line):
+    """Split one table line into stripped cell texts"""
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|") and not line.endswith("\\|"):
+        line = line[:-1]
+
+    # Fast path: no escapes, a plain split is exact
+    if "\\" not in line:
+        return [cell.strip() for cell in line.split("|")]
+
+    cells, current, i = [], [], 0
+    while i < len(line):
+        char = line[i]
+        if char == "\\" and i + 1 < len(line) and line[i + 1] == "|":
+            current.append("|")
+            i += 2
+            continue
+        if char == "|":
+            cells.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    cells.append("".join(current).strip())
+    return cells
+
+
+def strip_inline(cell):
+    """Plain text of a cell's inline markdown"""
+    if not any(char in cell for char in "[*_`<~"):
+        return cell
+    for marker, pattern, replacement in INLINE_PATTERNS:
+        # Skipping patterns whose marker is absent keeps plain cells cheap
+        if marker in cell:
+            cell = pattern.sub(replacement, cell)
+    return " ".join(cell.split())
+
+
+def _alignment(cell):
+    left, right = cell.startswith(":"), cell.endswith(":")
+    if left and right:
+        return "center"
+    if right:
+        return "right"
+    if left:
+        return "left"
+    return None
+
+
+def iter_tables(md_text, plain=False):
+    """Yield a Table for every pipe table in `md_text`.
+
+    `md_text` may be a string or any iterable of lines (e.g. an open file),
+    so large documents can be parsed without loading them first.
+    """
+    clean = strip_inline if plain else None
+    lines = md_text.splitlines() if isinstance(md_text, str) else md_text
+    previous = None
+    table = None
+
+    for line in lines:
+        if table is not None:
+            if "|" in line and line.strip():
+                cells = split_cells(line)
+                if clean:
+                    cells = [clean(cell) for cell in cells]
+                width = len(table.headers)
+                if len(cells) < width:
+                    cells += [""] * (width - len(cells))
+                table.rows.append(cells[:width])
+                continue
+            yield table
+            table = None
+
+        if previous is not None and "-" in line and SEPARATOR_RE.match(line):
+            headers = split_cells(previous)
+            if clean:
+                headers = [clean(cell) for cell in headers]
+            alignments = [_alignment(cell) for cell in split_cells(line)]
+            # A real header row has as many cells as the delimiter row
+            if len(headers) == len(alignments):
+                table = Table(headers, alignments, [])
+                previous = None
+                continue
+
+        previous = line if "|" in line else None
+
+    if table is not None:
+        yield table
+
+
+def first_table(md_text, plain=False):
+    """The first table in the document, or None"""
+    return next(iter_tables(md_text, plain), None)
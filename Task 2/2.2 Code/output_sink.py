@@ -0,0 +1,184 @@
+"""Streaming row sink shared by the scrapers.
+
+Instead of collecting every row in a Python list and writing one CSV at the
+very end, scrapers write rows to a `RowSink` as they are scraped. Rows are
+normalized to a fixed set of columns and flushed to disk every `batch_size`
+rows, so memory stays flat and a crash only loses the current batch.
+Fields outside the columns are never dropped silently: they either go into
+an `extra_column` as JSON or raise ValueError.
+
+* `*.csv` paths are appended to (the header is written once).
+* `*.parquet` paths are a directory of part files, one row group each, so
+  every flushed batch stays readable even if the process dies later.
+  Needs `pyarrow`.
+
+Usage:
+    with RowSink("train_data.csv", columns=["train_no", "train_name", "station", "timing"]) as sink:
+        sink.write_many(rows)
+
+    df = read_sink("train_data.csv")
+"""
+
+import csv
+import json
+import os
+
+DEFAULT_BATCH_SIZE = 500
+
+TRAIN_DATA_COLUMNS = ["train_no", "train_name", "station", "timing"]
+SCHEDULE_COLUMNS = ["train_number", "train_name", "station", "arrival", "departure"]
+# Scraped station tables, whatever their headers (see extraction.schedule_columns);
+# callers add their train key and keep the remaining columns in an extra column
+STATION_TABLE_COLUMNS = ["station", "arrival", "departure", "delay"]
+
+
+def _normalize_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
+
+
+class RowSink:
+    """Append-only, batch-flushed writer with a fixed column schema.
+
+    If `columns` is None the schema is taken from the first row written.
+    Missing fields are left empty. Fields not in the schema are stored as a
+    JSON object in `extra_column` if one is given, otherwise they raise
+    ValueError. Existing output is replaced unless `append=True` (e.g.
+    resuming a crawl).
+    """
+
+    def __init__(self, path, columns=None, batch_size=DEFAULT_BATCH_SIZE, append=False,
+                 extra_column=None):
+        self.path = path
+        self.extra_column = extra_column
+        self.columns = list(columns) if columns else None
+        if self.columns and extra_column and extra_column not in self.columns:
+            self.columns.append(extra_column)
+        self.batch_size = batch_size
+        self.parquet = path.endswith(".parquet")
+        self.rows_written = 0
+        self._buffer = []
+        self._parts = 0
+        self._checked = False   # existing output's columns compared with ours
+        if self.parquet:
+            os.makedirs(path, exist_ok=True)
+            parts = sorted(f for f in os.listdir(path) if f.endswith(".parquet"))
+            if append:
+                self._parts = len(parts)
+            else:
+                for part in parts:
+                    os.remove(os.path.join(path, part))
+        elif not append and os.path.exists(path):
+            os.remove(path)
+        if append and self.columns:
+            # Fail before any scraping work rather than at the first flush
+            self._check_existing_columns()
+            self._checked = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, row):
+        """Add one row, given as a dict or a sequence in column order"""
+        if not isinstance(row, dict):
+            if self.columns is None:
+                raise ValueError("Rows given as sequences need explicit columns")
+            row = dict(zip(self.columns, row))
+        if self.columns is None:
+            self.columns = list(row)
+            if self.extra_column and self.extra_column not in self.columns:
+                self.columns.append(self.extra_column)
+        unknown = [key for key in row if key not in self.columns]
+        if unknown:
+            if not self.extra_column:
+                raise ValueError(f"Fields not in the columns of {self.path}: {unknown}")
+            extra = {key: row[key] for key in unknown}
+            row = {key: value for key, value in row.items() if key in self.columns}
+            row[self.extra_column] = extra
+        self._buffer.append([_normalize_value(row.get(column)) for column in self.columns])
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        if not self._buffer:
+            return
+        if not self._checked:
+            self._check_existing_columns()
+            self._checked = True
+        if self.parquet:
+            self._flush_parquet()
+        else:
+            self._flush_csv()
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+
+    def _check_existing_columns(self):
+        """Refuse to append rows under a different header than the file already has"""
+        if self.parquet:
+            parts = sorted(f for f in os.listdir(self.path) if f.endswith(".parquet"))
+            if not parts:
+                return
+            import pyarrow.parquet as pq
+            existing = pq.read_schema(os.path.join(self.path, parts[0])).names
+        else:
+            if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+                return
+            with open(self.path, newline="", encoding="utf-8") as f:
+                existing = next(csv.reader(f), [])
+        if existing != self.columns:
+            raise ValueError(f"{self.path} has columns {existing}, not {self.columns}; "
+                             "write to a new path or without append=True")
+
+    def _flush_csv(self):
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(self.columns)
+            writer.writerows(self._buffer)
+
+    def _flush_parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table({column: [row[i] for row in self._buffer]
+                          for i, column in enumerate(self.columns)})
+        part = os.path.join(self.path, f"part-{self._parts:05d}.parquet")
+        # Write then rename, so a half-written part is never picked up
+        pq.write_table(table, part + ".tmp")
+        os.replace(part + ".tmp", part)
+        self._parts += 1
+
+    def close(self):
+        self.flush()
+
+
+def read_sink(path, columns=None):
+    """Load a sink's output into a DataFrame, optionally only some columns"""
+    import pandas as pd
+
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns, dtype=str, keep_default_na=False)
+
+
+def iter_sink(path, chunksize=10000, columns=None):
+    """Yield a sink's output as DataFrames of at most `chunksize` rows"""
+    import pandas as pd
+
+    if path.endswith(".parquet"):
+        for part in sorted(f for f in os.listdir(path) if f.endswith(".parquet")):
+            yield pd.read_parquet(os.path.join(path, part), columns=columns)
+        return
+    yield from pd.read_csv(path, usecols=columns, dtype=str, keep_default_na=False,
+                           chunksize=chunksize)
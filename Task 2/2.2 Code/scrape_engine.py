@@ -0,0 +1,211 @@
+"""Concurrent scraping engine with per-provider rate limiting.
+
+Scraping one URL at a time (with a fixed sleep before every call) leaves most
+of the API quota unused. This module runs scrape jobs concurrently on asyncio
+while a shared token bucket per provider keeps the request rate right at the
+quota ceiling, retries calls rejected with HTTP 429 and reports progress.
+
+Usage (script):
+    results = scrape_all(urls, scrape_train, provider="firecrawl")
+
+Usage (notebook / Colab, where an event loop is already running):
+    results = await scrape_all_async(urls, scrape_train, provider="firecrawl")
+"""
+
+import asyncio
+import inspect
+import random
+import re
+import threading
+import time
+
+# Requests per minute and concurrent jobs allowed by each provider's plan.
+# Adjust these to your own quota; the engine will run right up to them.
+PROVIDER_LIMITS = {
+    "firecrawl": {"requests_per_minute": 10, "concurrent_jobs": 2},
+    "firecrawl_crawl": {"requests_per_minute": 3, "concurrent_jobs": 1},
+    "groq": {"requests_per_minute": 30, "concurrent_jobs": 4},
+    "default": {"requests_per_minute": 60, "concurrent_jobs": 4},
+}
+
+MAX_RETRIES = 5
+SLOT_POLL_INTERVAL = 0.05   # seconds between tries for a free slot from a coroutine
+BACKOFF_BASE = 2.0   # seconds, doubled on every 429
+BACKOFF_MAX = 60.0
+
+# Fallback for clients that only put the status in the message. A bare "429"
+# is not enough: train numbers like 12429 appear in the URLs of error texts.
+RATE_LIMIT_RE = re.compile(
+    r"too many requests|rate[ _-]?limit|\b(?:status|error)(?:[ _]code)?\W{0,3}429\b",
+    re.IGNORECASE,
+)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate_per_minute`.
+
+    `reserve()` takes a token and returns how long the caller has to wait
+    before using it, so the same bucket works for threads and coroutines.
+    """
+
+    def __init__(self, rate_per_minute, capacity=1):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def penalize(self, seconds):
+        """Push the next free token back, e.g. after the provider returned 429"""
+        with self.lock:
+            self.tokens = min(self.tokens, -seconds * self.rate)
+            self.updated = time.monotonic()
+
+
+class RateLimiter:
+    """Request-rate and concurrency limit for one provider.
+
+    Use `async with limiter:` from coroutines and `with limiter:` from
+    threads (e.g. an LLM call made inside a scrape job). Both draw on the same
+    `concurrent_jobs` slots, whichever thread or event loop they run on.
+    """
+
+    def __init__(self, requests_per_minute, concurrent_jobs):
+        self.bucket = TokenBucket(requests_per_minute)
+        self.concurrent_jobs = concurrent_jobs
+        self._slots = threading.BoundedSemaphore(concurrent_jobs)
+
+    async def __aenter__(self):
+        # Polled rather than blocking, so waiting never ties up an executor
+        # thread or the event loop
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(SLOT_POLL_INTERVAL)
+        try:
+            await asyncio.sleep(self.bucket.reserve())
+        except BaseException:
+            self._slots.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        self._slots.release()
+
+    def __enter__(self):
+        self._slots.acquire()
+        time.sleep(self.bucket.reserve())
+        return self
+
+    def __exit__(self, *exc):
+        self._slots.release()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider):
+    """Return the shared limiter for a provider, creating it on first use"""
+    with _limiters_lock:
+        if provider not in _limiters:
+            limits = PROVIDER_LIMITS.get(provider, PROVIDER_LIMITS["default"])
+            _limiters[provider] = RateLimiter(**limits)
+        return _limiters[provider]
+
+
+def is_rate_limited(error):
+    """True if an exception looks like an HTTP 429 from any client library"""
+    for obj in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "status"):
+            status = getattr(obj, attr, None)
+            if status is not None and str(status) == "429":
+                return True
+    return RATE_LIMIT_RE.search(str(error)) is not None
+
+
+def retry_after(error, attempt):
+    """Seconds to wait before retrying a rate-limited call"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return min(float(headers.get("retry-after")), BACKOFF_MAX)
+    except (TypeError, ValueError):
+        return min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX) * (1 + random.random() / 4)
+
+
+def print_progress(done, total, item, error, started):
+    rate = done / max(time.monotonic() - started, 1e-9) * 60
+    status = f"failed: {error}" if error else "ok"
+    print(f"[{done}/{total}] {item} {status} ({rate:.1f}/min)")
+
+
+async def _run_job(item, worker, limiter):
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with limiter:
+                if inspect.iscoroutinefunction(worker):
+                    return await worker(item)
+                return await asyncio.to_thread(worker, item)
+        except Exception as e:
+            if not is_rate_limited(e) or attempt == MAX_RETRIES:
+                raise
+            wait = retry_after(e, attempt)
+            limiter.bucket.penalize(wait)
+            print(f"Rate limited on {item}, retrying in {wait:.1f}s")
+            await asyncio.sleep(wait)
+
+
+async def run_jobs(items, worker, provider="default", on_progress=print_progress,
+                   on_result=None):
+    """Run `worker(item)` for every item under the provider's limits.
+
+    `worker` may be a plain function (run in a thread) or a coroutine
+    function. `on_result(item, result)` is called as each job succeeds, e.g.
+    to write rows out straight away; those results are then not kept in
+    memory. Returns a list of (item, result, error) in input order.
+    """
+    items = list(items)
+    limiter = get_limiter(provider)
+    started = time.monotonic()
+    results = [None] * len(items)
+    done = 0
+
+    async def run(index, item):
+        nonlocal done
+        result, error = None, None
+        try:
+            result = await _run_job(item, worker, limiter)
+        except Exception as e:
+            error = e
+        if on_result and error is None:
+            on_result(item, result)
+            result = None
+        results[index] = (item, result, error)
+        done += 1
+        if on_progress:
+            on_progress(done, len(items), item, error, started)
+
+    await asyncio.gather(*(run(i, item) for i, item in enumerate(items)))
+    return results
+
+
+async def scrape_all_async(urls, scrape_fn, provider="firecrawl", on_progress=print_progress,
+                           on_result=None):
+    """Scrape all URLs concurrently and return the successful results in order"""
+    results = await run_jobs(urls, scrape_fn, provider, on_progress, on_result)
+    return [result for _, result, error in results if error is None]
+
+
+def scrape_all(urls, scrape_fn, provider="firecrawl", on_progress=print_progress,
+               on_result=None):
+    """Blocking wrapper around `scrape_all_async` for plain scripts"""
+    return asyncio.run(scrape_all_async(urls, scrape_fn, provider, on_progress, on_result))
@@ -0,0 +1,231 @@
+"""Incremental running-status store: keep only what changed between polls.
+
+Polling a train's running status returns the whole station table every time,
+and dumping each poll to CSV grows with the number of polls. `StatusStore`
+ingests each snapshot, compares it with the last known state of every
+(train, journey date, station) and writes only the fields that changed
+(actual times, delay, current station), so storage grows with changes.
+
+Tables (SQLite):
+    stop_state    latest value per (train, journey_date, station)
+    train_state   latest current station / delay per (train, journey_date)
+    changes       append-only log of (observed_at, field, old -> new) deltas
+
+Usage:
+    store = StatusStore()
+    store.ingest(train, journey_date, stops, current_station="NDLS", delay=12)
+    store.delay_history(train)      # how the delay evolved
+    store.latest_states()           # where every train is now
+"""
+
+import re
+import sqlite3
+from datetime import date, datetime, timedelta
+
+DB_PATH = "running_status.db"
+
+STOP_FIELDS = ("actual_arrival", "actual_departure", "delay")
+TRAIN_FIELDS = ("current_station", "delay")
+TRAIN_LEVEL = ""   # station key used for train-level fields in `changes`
+
+# Lower-cased source keys/column headers -> stored field names
+FIELD_ALIASES = {
+    "station": "station", "station_code": "station", "stationcode": "station",
+    "station name": "station", "station_name": "station", "stn": "station",
+    "actual_arrival": "actual_arrival", "actual arrival": "actual_arrival",
+    "act arr": "actual_arrival", "eta": "actual_arrival", "arrived": "actual_arrival",
+    "actual_departure": "actual_departure", "actual departure": "actual_departure",
+    "act dep": "actual_departure", "etd": "actual_departure", "departed": "actual_departure",
+    "delay": "delay", "arrival_delay": "delay", "delay_minutes": "delay", "late": "delay",
+    "delay (min)": "delay",
+}
+
+# "Start Date: 18-Oct-2026", "Started on 18 Oct", "Journey date 2026-10-18", ...
+JOURNEY_DATE_RE = re.compile(
+    r"\b(?:start(?:ed|ing)?|journey|departed)(?:\s+(?:date|day|on))*\W{0,3}\s*"
+    # The year must not be the start of a following time ("17 Oct 10:30")
+    r"(\d{4}-\d{2}-\d{2}|\d{1,2}[-/ ](?:\d{1,2}|[A-Za-z]{3,9})(?:[-/ ]\d{2,4}(?![:\d]))?)",
+    re.IGNORECASE,
+)
+DATE_FORMATS = ("%Y-%m-%d", "%d-%b-%Y", "%d %b %Y", "%d-%B-%Y", "%d %B %Y", "%d/%m/%Y",
+                "%d-%m-%Y", "%d-%b-%y", "%d %b %y", "%d/%m/%y")
+
+
+def normalize_stop(row):
+    """Map a scraped row/API record onto station + STOP_FIELDS"""
+    stop = {}
+    for key, value in row.items():
+        field = FIELD_ALIASES.get(str(key).strip().lower())
+        if field and field not in stop and value not in (None, ""):
+            stop[field] = str(value).strip()
+    return stop
+
+
+def _parse_date(text, today):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    # No year on the page ("18 Oct"): the most recent such day
+    for fmt in ("%d-%b", "%d %b", "%d-%B", "%d %B", "%d/%m"):
+        try:
+            parsed = datetime.strptime(f"{text} {today.year}", f"{fmt} %Y").date()
+        except ValueError:
+            continue
+        return parsed if parsed <= today else parsed.replace(year=today.year - 1)
+    return None
+
+
+def journey_date_from_text(text, default=None):
+    """ISO start date of the journey shown on a running-status page, or `default`
+
+    >>> journey_date_from_text("Start Date: 18-Oct-2026")
+    '2026-10-18'
+    >>> journey_date_from_text("Started 17 Oct 2025 10:30")
+    '2025-10-17'
+    >>> journey_date_from_text("Departed NDLS at 16:55", default="?")
+    '?'
+    """
+    today = date.today()
+    for match in JOURNEY_DATE_RE.finditer(text or ""):
+        parsed = _parse_date(match.group(1).strip(), today)
+        if parsed is not None:
+            return parsed.isoformat()
+    return default
+
+
+def current_from_stops(stops):
+    """(current station, delay) from a station table: the last stop with an actual time"""
+    for stop in reversed(stops):
+        if stop.get("station") and (stop.get("actual_arrival") or stop.get("actual_departure")):
+            return stop["station"], stop.get("delay")
+    return None, None
+
+
+def stops_from_rapidapi(data):
+    """Stops, current station and delay from an irctc1 liveTrainStatus payload"""
+    data = data.get("data") or data
+    stops = [normalize_stop(s) for s in
+             (data.get("previous_stations") or []) + (data.get("upcoming_stations") or [])]
+    current = data.get("current_station_code") or data.get("current_station_name")
+    return stops, current, data.get("delay")
+
+
+class StatusStore:
+    """Delta-only time series of running status, stored in SQLite"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        conn = self._connect()
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS stop_state
+                (train TEXT, journey_date TEXT, station TEXT,
+                 actual_arrival TEXT, actual_departure TEXT, delay TEXT,
+                 updated_at TEXT,
+                 PRIMARY KEY (train, journey_date, station));
+            CREATE TABLE IF NOT EXISTS train_state
+                (train TEXT, journey_date TEXT,
+                 current_station TEXT, delay TEXT, updated_at TEXT,
+                 PRIMARY KEY (train, journey_date));
+            CREATE TABLE IF NOT EXISTS changes
+                (train TEXT, journey_date TEXT, station TEXT,
+                 observed_at TEXT, field TEXT, old_value TEXT, new_value TEXT);
+            CREATE INDEX IF NOT EXISTS changes_by_train
+                ON changes (train, field, journey_date, observed_at);
+            CREATE INDEX IF NOT EXISTS train_state_by_time
+                ON train_state (updated_at);
+        ''')
+        conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def ingest(self, train, journey_date, stops, current_station=None, delay=None,
+               observed_at=None):
+        """Record one snapshot; returns how many fields changed"""
+        train, journey_date = str(train), str(journey_date)
+        observed_at = observed_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn = self._connect()
+        changes = []
+
+        known = {row[0]: dict(zip(STOP_FIELDS, row[1:])) for row in conn.execute(
+            "SELECT station, actual_arrival, actual_departure, delay FROM stop_state "
+            "WHERE train = ? AND journey_date = ?", (train, journey_date))}
+
+        for stop in stops:
+            station = stop.get("station")
+            if not station:
+                continue
+            before = known.get(station, dict.fromkeys(STOP_FIELDS))
+            after = dict(before)
+            for field in STOP_FIELDS:
+                value = stop.get(field)
+                # Missing fields keep their last value rather than counting as a change
+                if value not in (None, "") and str(value) != before[field]:
+                    after[field] = str(value)
+                    changes.append((train, journey_date, station, observed_at,
+                                    field, before[field], str(value)))
+            if after != before or station not in known:
+                conn.execute("INSERT OR REPLACE INTO stop_state VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (train, journey_date, station, *(after[f] for f in STOP_FIELDS),
+                              observed_at))
+
+        row = conn.execute("SELECT current_station, delay FROM train_state "
+                           "WHERE train = ? AND journey_date = ?", (train, journey_date)).fetchone()
+        before = dict(zip(TRAIN_FIELDS, row or (None, None)))
+        after = dict(before)
+        for field, value in zip(TRAIN_FIELDS, (current_station, delay)):
+            if value not in (None, "") and str(value) != before[field]:
+                after[field] = str(value)
+                changes.append((train, journey_date, TRAIN_LEVEL, observed_at,
+                                field, before[field], str(value)))
+        if after != before or row is None:
+            conn.execute("INSERT OR REPLACE INTO train_state VALUES (?, ?, ?, ?, ?)",
+                         (train, journey_date, after["current_station"], after["delay"],
+                          observed_at))
+
+        conn.executemany("INSERT INTO changes VALUES (?, ?, ?, ?, ?, ?, ?)", changes)
+        conn.commit()
+        conn.close()
+        return len(changes)
+
+    def delay_history(self, train, journey_date=None):
+        """[(journey_date, observed_at, station, delay)] in time order.
+
+        Train-level delay changes have station "" (TRAIN_LEVEL).
+        """
+        query = ("SELECT journey_date, observed_at, station, new_value FROM changes "
+                 "WHERE train = ? AND field = 'delay'")
+        params = [str(train)]
+        if journey_date:
+            query += " AND journey_date = ?"
+            params.append(str(journey_date))
+        conn = self._connect()
+        rows = conn.execute(query + " ORDER BY journey_date, observed_at", params).fetchall()
+        conn.close()
+        return rows
+
+    def latest_states(self, since_days=2):
+        """Latest (train, journey_date, current_station, delay, updated_at) per train"""
+        since = (date.today() - timedelta(days=since_days)).isoformat()
+        conn = self._connect()
+        rows = conn.execute(
+            """SELECT train, journey_date, current_station, delay, MAX(updated_at)
+               FROM train_state WHERE updated_at >= ?
+               GROUP BY train ORDER BY train""",
+            (since,),
+        ).fetchall()
+        conn.close()
+        return rows
+
+    def stop_states(self, train, journey_date):
+        """Current station table of one journey, rebuilt from the latest state"""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT station, actual_arrival, actual_departure, delay, updated_at "
+            "FROM stop_state WHERE train = ? AND journey_date = ?",
+            (str(train), str(journey_date)),
+        ).fetchall()
+        conn.close()
+        return rows
@@ -4,7 +4,12 @@ import requests
 import json
 import sqlite3
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from collections import Counter
+import inspect
 import re
+import threading
+import time
 
 # Configure Gemini API
 GEMINI_API_KEY = "USE API KEY"
@@ -13,6 +18,9 @@ genai.configure(api_key=GEMINI_API_KEY)
 # RailRadar API Base URL
 RAILRADAR_API_BASE = "https://railradar.in/api/v1"
 
+# Board and status times are Indian Standard Time, whatever the host's timezone
+IST = ZoneInfo("Asia/Kolkata")
+
 # Initialize SQLite Database
 def init_database():
     conn = sqlite3.connect('train_queries.db')
@@ -49,6 +57,16 @@ def search_stations(query):
 
 def get_live_station_board(station_code, hours=8, to_station_code=None):
     """Get live station board with departures/arrivals"""
+    # Prefetched boards cover the full look-ahead window for all destinations,
+    # so they can only stand in for unfiltered requests
+    if not to_station_code and (hours or PREFETCH_BOARD_HOURS) <= PREFETCH_BOARD_HOURS:
+        cached = get_live_cache().get("board", station_code)
+        if cached is not None:
+            return cached
+    return fetch_live_station_board(station_code, hours, to_station_code)
+
+def fetch_live_station_board(station_code, hours=8, to_station_code=None):
+    """Fetch the live station board from RailRadar, bypassing the cache"""
     try:
         params = {"hours": hours}
         if to_station_code:
@@ -79,6 +97,14 @@ def get_trains_between_stations(from_code, to_code):
 
 def get_train_live_status(train_number, journey_date=None):
     """Get live status of a train"""
+    if not journey_date:
+        cached = get_live_cache().get("train", train_number)
+        if cached is not None:
+            return cached
+    return fetch_train_live_status(train_number, journey_date)
+
+def fetch_train_live_status(train_number, journey_date=None):
+    """Fetch the live status of a train from RailRadar, bypassing the cache"""
     try:
         params = {"dataType": "live"}
         if journey_date:
@@ -105,6 +131,334 @@ def search_trains(query):
     except Exception as e:
         return None
 
+# Live Data Cache & Prefetch
+# Most lookups hit the same few stations and commuter trains, so a background
+# thread keeps their live boards/statuses warm and the tools serve those from
+# memory while they are still fresh.
+DEFAULT_HOT_STATIONS = ["CSMT", "NR", "DR", "KYN", "TNA", "BVI"]
+PREFETCH_TOP_STATIONS = 12
+PREFETCH_TOP_TRAINS = 12
+PREFETCH_LOOKBACK_DAYS = 7
+PREFETCH_BOARD_HOURS = 8
+PREFETCH_INTERVAL = 120        # seconds between refresh cycles
+PREFETCH_MIN_GAP = 2.0         # seconds between API requests (rate limit)
+CACHE_TTL = 180                # seconds a prefetched entry counts as fresh
+PREFETCH_IDLE_AFTER = 900      # stop refreshing when the app has been unused this long
+
+class LiveCache:
+    """Thread-safe in-memory store of recently fetched live payloads"""
+
+    def __init__(self, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.last_used = time.time()
+
+    def touch(self):
+        """Mark the app as in use, which keeps the prefetch running"""
+        self.last_used = time.time()
+
+    def is_idle(self):
+        return time.time() - self.last_used > PREFETCH_IDLE_AFTER
+
+    def get(self, kind, key):
+        with self._lock:
+            entry = self._entries.get((kind, str(key).upper()))
+        if entry is None or time.time() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def put(self, kind, key, payload):
+        with self._lock:
+            self._entries[(kind, str(key).upper())] = (time.time(), payload)
+
+def get_hot_keys(db_path='train_queries.db'):
+    """Most requested station codes and train numbers from the query history"""
+    stations = Counter()
+    trains = Counter()
+    since = (datetime.now() - timedelta(days=PREFETCH_LOOKBACK_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+
+    try:
+        conn = sqlite3.connect(db_path)
+        c = conn.cursor()
+        c.execute("SELECT user_query, api_calls FROM queries WHERE timestamp >= ?", (since,))
+        history = c.fetchall()
+        conn.close()
+    except sqlite3.Error:
+        history = []
+
+    for user_query, api_calls in history:
+        try:
+            calls = json.loads(api_calls) if api_calls else []
+        except ValueError:
+            calls = []
+        for call in calls:
+            args = call.get("args") or {}
+            if call.get("function") == "get_live_station_board" and args.get("station_code"):
+                stations[str(args["station_code"]).upper()] += 1
+            elif call.get("function") == "get_train_live_status" and args.get("train_number"):
+                trains[str(args["train_number"])] += 1
+        # Train numbers typed by the user count even if no status call was made
+        for number in re.findall(r"\b\d{5}\b", user_query or ""):
+            trains[number] += 1
+
+    hot_stations = [code for code, _ in stations.most_common(PREFETCH_TOP_STATIONS)]
+    for code in DEFAULT_HOT_STATIONS:
+        if len(hot_stations) >= PREFETCH_TOP_STATIONS:
+            break
+        if code not in hot_stations:
+            hot_stations.append(code)
+
+    return hot_stations, [number for number, _ in trains.most_common(PREFETCH_TOP_TRAINS)]
+
+def refresh_hot_data(cache):
+    """Fetch fresh data for the current hot stations and trains"""
+    stations, trains = get_hot_keys()
+    jobs = [("board", code, fetch_live_station_board, (code, PREFETCH_BOARD_HOURS))
+            for code in stations]
+    jobs += [("train", number, fetch_train_live_status, (number,))
+             for number in trains]
+
+    for kind, key, fetch, args in jobs:
+        payload = fetch(*args)
+        if payload is not None:
+            cache.put(kind, key, payload)
+        time.sleep(PREFETCH_MIN_GAP)
+
+def prefetch_loop(cache):
+    while True:
+        started = time.time()
+        # Nobody is using the assistant, so don't spend API quota on it
+        if cache.is_idle():
+            time.sleep(PREFETCH_INTERVAL)
+            continue
+        try:
+            refresh_hot_data(cache)
+        except Exception as e:
+            print(f"Prefetch cycle failed: {e}")
+        time.sleep(max(0, PREFETCH_INTERVAL - (time.time() - started)))
+
+@st.cache_resource
+def get_live_cache():
+    """Create the shared cache once per process and start warming it"""
+    cache = LiveCache()
+    threading.Thread(target=prefetch_loop, args=(cache,), daemon=True,
+                     name="railradar-prefetch").start()
+    return cache
+
+# Response Projection
+# The raw RailRadar payloads are far larger than what the assistant needs to
+# answer a question. Each tool result is projected down to the fields below
+# before it is handed to Gemini; the full payload is kept for the API-calls log.
+MAX_BOARD_ROWS = 15
+MAX_BETWEEN_ROWS = 20
+MAX_SEARCH_ROWS = 10
+MAX_ROUTE_STOPS = 12
+
+# Output field -> normalized source keys (lowercase, no underscores, nested
+# dicts flattened so {"train": {"number": ..}} matches "trainnumber")
+TRAIN_FIELDS = {
+    "train_number": ["trainnumber", "trainno", "number"],
+    "train_name": ["trainname", "name"],
+}
+BOARD_FIELDS = {
+    **TRAIN_FIELDS,
+    "scheduled_arrival": ["scheduledarrival", "scharrival", "arrivaltime", "sta"],
+    "scheduled_departure": ["scheduleddeparture", "schdeparture", "departuretime", "std"],
+    "expected_arrival": ["expectedarrival", "actualarrival", "livearrival", "eta"],
+    "expected_departure": ["expecteddeparture", "actualdeparture", "livedeparture", "etd"],
+    "delay_minutes": ["delayminutes", "delayarrival", "delaydeparture", "delay"],
+    "platform": ["platform", "platformnumber", "pf"],
+    "destination": ["destinationcode", "tostationcode", "deststationcode", "destination"],
+}
+BETWEEN_FIELDS = {
+    **TRAIN_FIELDS,
+    "departure": ["fromdeparture", "departuretime", "departure", "scheduleddeparture"],
+    "arrival": ["toarrival", "arrivaltime", "arrival", "scheduledarrival"],
+    "duration": ["duration", "traveltime", "durationminutes"],
+    "running_days": ["runningdays", "rundays", "days"],
+}
+STOP_FIELDS = {
+    "station_code": ["stationcode", "code"],
+    "station_name": ["stationname", "name"],
+    "scheduled_arrival": ["scheduledarrival", "scharrival", "arrivaltime", "sta"],
+    "expected_arrival": ["expectedarrival", "actualarrival", "livearrival", "eta"],
+    "delay_minutes": ["delayminutes", "delayarrival", "delay"],
+    "platform": ["platform", "platformnumber", "pf"],
+}
+LIVE_STATUS_FIELDS = {
+    **TRAIN_FIELDS,
+    "current_station": ["currentstationname", "currentstationcode", "currentstation", "lastlocation"],
+    "delay_minutes": ["delayminutes", "currentdelay", "delay"],
+    "status": ["statusmessage", "status", "runningstatus"],
+    "last_updated": ["lastupdated", "updatedat", "lastupdatetime"],
+}
+SEARCH_FIELDS = {
+    "code": ["stationcode", "code", "trainnumber", "number"],
+    "name": ["stationname", "trainname", "name"],
+}
+
+def _normalize_key(key):
+    return str(key).replace("_", "").replace("-", "").lower()
+
+def _flatten(record, prefix=""):
+    """Flatten nested dicts into a single level of normalized keys"""
+    flat = {}
+    for key, value in record.items():
+        name = prefix + _normalize_key(key)
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif not isinstance(value, list):
+            flat.setdefault(name, value)
+    return flat
+
+def _pick(record, fields):
+    """Keep only the wanted fields of a record, renamed to their output names"""
+    if not isinstance(record, dict):
+        return record
+    flat = _flatten(record)
+    picked = {}
+    for out_name, candidates in fields.items():
+        for candidate in candidates:
+            if flat.get(candidate) not in (None, ""):
+                picked[out_name] = flat[candidate]
+                break
+    return picked
+
+def _unwrap(payload):
+    """Strip the {"success": .., "data": ..} envelope if present"""
+    if isinstance(payload, dict) and "data" in payload:
+        return payload["data"]
+    return payload
+
+def _find_rows(payload, keys):
+    """Return the first list of records found under one of the given keys"""
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        for key in keys:
+            if isinstance(payload.get(key), list):
+                return payload[key]
+        for value in payload.values():
+            if isinstance(value, list) and value and isinstance(value[0], dict):
+                return value
+    return []
+
+def _parse_time(value, now):
+    """Parse an ISO timestamp or HH:MM string into a datetime near `now`"""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        # Aware timestamps are converted to IST; naive ones already are
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(IST)
+        return parsed.replace(tzinfo=None)
+    except ValueError:
+        pass
+    match = re.match(r"^(\d{1,2}):(\d{2})", value)
+    if not match:
+        return None
+    parsed = now.replace(hour=int(match.group(1)), minute=int(match.group(2)),
+                         second=0, microsecond=0)
+    # Board times past midnight belong to the next day
+    if parsed < now - timedelta(hours=1):
+        parsed += timedelta(days=1)
+    return parsed
+
+def project_station_board(payload, station_code=None, hours=8, to_station_code=None):
+    """Upcoming trains at a station, limited to the time window.
+
+    The destination filter is applied by RailRadar (toStationCode), which
+    matches trains stopping there, not just trains terminating there.
+    """
+    data = _unwrap(payload)
+    rows = [_pick(r, BOARD_FIELDS) for r in _find_rows(data, ["trains", "board", "departures"])]
+
+    # Compare in IST, as a naive "now" on a UTC host is 5.5 hours off
+    now = datetime.now(IST).replace(tzinfo=None)
+    window_end = now + timedelta(hours=hours or 8)
+    in_window = []
+    for row in rows:
+        when = _parse_time(row.get("expected_departure") or row.get("scheduled_departure")
+                           or row.get("expected_arrival") or row.get("scheduled_arrival"), now)
+        # Keep rows we cannot place in time rather than silently dropping them
+        if when is None or now - timedelta(minutes=30) <= when <= window_end:
+            in_window.append(row)
+
+    return {
+        "station_code": station_code,
+        "total_trains": len(in_window),
+        "trains": in_window[:MAX_BOARD_ROWS],
+    }
+
+def project_trains_between(payload, from_code=None, to_code=None):
+    """Trains running between two stations, with timings only"""
+    rows = _find_rows(_unwrap(payload), ["trains"])
+    return {
+        "from": from_code,
+        "to": to_code,
+        "total_trains": len(rows),
+        "trains": [_pick(r, BETWEEN_FIELDS) for r in rows[:MAX_BETWEEN_ROWS]],
+    }
+
+def project_train_live_status(payload, train_number=None, journey_date=None):
+    """Current position and delay of a train plus the next few stops"""
+    data = _unwrap(payload)
+    if not isinstance(data, dict):
+        return data
+    projected = _pick(data, LIVE_STATUS_FIELDS)
+    projected.setdefault("train_number", train_number)
+
+    stops = _find_rows(data, ["route", "stations", "stops", "timeline"])
+    upcoming = [s for s in stops
+                if isinstance(s, dict) and not (s.get("hasDeparted") or s.get("departed"))]
+    projected["upcoming_stops"] = [_pick(s, STOP_FIELDS)
+                                   for s in (upcoming or stops)[:MAX_ROUTE_STOPS]]
+    return projected
+
+def project_search(payload, query=None):
+    """Code and name of the best search matches"""
+    rows = _find_rows(_unwrap(payload), ["stations", "trains", "results"])
+    return [_pick(r, SEARCH_FIELDS) for r in rows[:MAX_SEARCH_ROWS]]
+
+PROJECTIONS = {
+    "search_stations": project_search,
+    "get_live_station_board": project_station_board,
+    "get_trains_between_stations": project_trains_between,
+    "get_train_live_status": project_train_live_status,
+    "search_trains": project_search,
+}
+
+def _tool_args(args):
+    """Plain Python arguments from a Gemini function call"""
+    kwargs = {}
+    for key, value in dict(args).items():
+        # Struct numbers arrive as floats; the APIs expect "8", not "8.0"
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        kwargs[key] = value
+    return kwargs
+
+def run_tool(name, kwargs):
+    """Call an API function; returns (full payload, projection for the model)"""
+    func = function_map.get(name)
+    if func is None:
+        return None, {"error": f"Unknown function {name}"}
+    try:
+        bound = inspect.signature(func).bind(**kwargs)
+    except TypeError as e:
+        return None, {"error": str(e)}
+    bound.apply_defaults()
+    payload = func(**bound.arguments)
+    if payload is None:
+        return None, {"error": "No data returned by the API"}
+    try:
+        return payload, PROJECTIONS[name](payload, **bound.arguments)
+    except Exception:
+        # An unexpected payload shape should never break the answer
+        return payload, payload
+
 # LLM Function Calling Setup
 tools = [
     {
@@ -204,6 +558,9 @@ function_map = {
     "search_trains": search_trains
 }
 
+# Upper bound on model <-> tool round trips for a single query
+MAX_TOOL_ROUNDS = 6
+
 def process_query_with_llm(user_query):
     """Process user query using Gemini with function calling"""
     
@@ -212,7 +569,7 @@ def process_query_with_llm(user_query):
         tools=tools
     )
     
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    current_time = datetime.now(IST).strftime("%Y-%m-%d %H:%M:%S")
     system_prompt = f"""You are a helpful Indian Railways assistant. Current date and time: {current_time}
 
 When users ask about trains:
@@ -231,7 +588,9 @@ Common station codes:
 - BVI: Borivali
 """
     
-    chat = model.start_chat(enable_automatic_function_calling=True)
+    # Tool calls are executed here rather than by the SDK, so the model only
+    # ever sees the projected results and the full payloads stay with this call
+    chat = model.start_chat()
     
     api_calls_made = []
     
@@ -239,15 +598,27 @@ Common station codes:
         # Send the query
         response = chat.send_message(system_prompt + "\n\nUser query: " + user_query)
         
-        # Track function calls
-        for content in chat.history:
-            if hasattr(content, 'parts'):
-                for part in content.parts:
-                    if hasattr(part, 'function_call'):
-                        api_calls_made.append({
-                            'function': part.function_call.name,
-                            'args': dict(part.function_call.args)
-                        })
+        for _ in range(MAX_TOOL_ROUNDS):
+            calls = [part.function_call for part in response.parts
+                     if part.function_call.name]
+            if not calls:
+                break
+            
+            replies = []
+            for call in calls:
+                args = _tool_args(call.args)
+                payload, result = run_tool(call.name, args)
+                # Track function calls with their full (unprojected) payloads
+                api_calls_made.append({
+                    'function': call.name,
+                    'args': args,
+                    'response': payload
+                })
+                replies.append(genai.protos.Part(
+                    function_response=genai.protos.FunctionResponse(
+                        name=call.name, response={"result": result})))
+            
+            response = chat.send_message(replies)
         
         return response.text, api_calls_made
     
@@ -265,6 +636,9 @@ def main():
     # Initialize database
     init_database()
     
+    # Start warming the live data cache (and keep it warm while in use)
+    get_live_cache().touch()
+    
     # Header
     st.title("🚆 Indian Railways Live Information Assistant")
     st.markdown("*Ask me anything about trains, stations, and live running status!*")